@@ -7,7 +7,7 @@ from datetime import datetime
 from langchain_core.messages import AIMessage
 from langgraph.graph import StateGraph, END
 from app.agents.agent_state import AgentState
-from app.db.database import get_database, get_activities_collection
+from app.db.database import get_database, get_activities_collection, trip_lookup_filter
 from bson import ObjectId
 
 
@@ -37,10 +37,7 @@ class ConsensusAgent:
             trips = db.trips
             
             # Get trip with phase tracking
-            try:
-                trip = await trips.find_one({"_id": ObjectId(trip_id)})
-            except:
-                trip = await trips.find_one({"trip_code": trip_id.upper()})
+            trip = await trips.find_one(trip_lookup_filter(trip_id))
             
             if not trip:
                 return {"done": True, "messages": [AIMessage(content="[consensus] Trip not found")]}
@@ -304,8 +301,10 @@ class ConsensusAgent:
         prefs_col = db.preferences
         trips_col = db.trips
         
-        # Get all preferences
-        preferences = await prefs_col.find({"trip_id": trip_id}).to_list(length=None)
+        # Get all preferences (only the destination field is needed)
+        preferences = await prefs_col.find(
+            {"trip_id": trip_id}, {"_id": 0, "destination": 1}
+        ).to_list(length=None)
         
         if not preferences:
             print("[consensus] No preferences found")
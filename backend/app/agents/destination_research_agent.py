@@ -183,6 +183,14 @@ Rules:
   - "Add Culture to get more daytime options"
 """
 
+# Built once: the system message is a stable prefix, only {payload} varies per call
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM),
+        ("user", "Input:\n{payload}\n\nReturn JSON only."),
+    ]
+)
+
 
 def _median_budget(bands: list[str]) -> int:
     vals: list[int] = []
@@ -395,7 +403,7 @@ class DestinationResearchAgent:
             await broadcast("Destination Research Agent", "running", f"Geocoding destination: {dest}", progress={"current": 1, "total": 4})
 
         # Actually geocode the destination
-        coords = DestinationResearchAgent._geocode_place(dest)
+        coords = await asyncio.to_thread(DestinationResearchAgent._geocode_place, dest)
         if not coords:
             warnings.append(f"Could not geocode destination: {dest} (continuing without coordinates)")
             insights.append("Try a more specific location like 'London, UK' or 'Tokyo, Japan'")
@@ -447,13 +455,6 @@ class DestinationResearchAgent:
             "categories": _CATEGORY_SET,
         }
 
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", SYSTEM),
-                ("user", "Input:\n{payload}\n\nReturn JSON only."),
-            ]
-        )
-
         # If LLM is not available, or invocation fails, return a helpful fallback
         if self.llm is None:
             if self._llm_unavailable_reason:
@@ -491,7 +492,7 @@ class DestinationResearchAgent:
         # SINGLE LLM CALL PER TRIP: Generate all activities at once
         # This is the only LLM call in destination research agent
         structured_llm = self.llm.with_structured_output(ActivityCatalogOut)
-        run = prompt | structured_llm
+        run = PROMPT | structured_llm
         
         # Broadcast AI generation status
         if broadcast:
@@ -506,7 +507,7 @@ class DestinationResearchAgent:
             api_start = time.time()
             try:
                 print(f"[API] Calling OpenAI API for activity generation (attempt {api_attempt}/{max_retries})...")
-                result = run.invoke({"payload": payload})
+                result = await run.ainvoke({"payload": payload})
                 api_latency = (time.time() - api_start) * 1000
                 print(f"[API] ✅ OpenAI API call succeeded")
                 print(f"[PERF] API latency: {api_latency:.2f}ms")
@@ -532,7 +533,7 @@ class DestinationResearchAgent:
                 if api_attempt < max_retries:
                     retry_delay = 1.5  # Fixed 1.5s delay instead of exponential backoff
                     print(f"[RETRY] Waiting {retry_delay}s before retry...")
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
                 else:
                     print(f"[ERROR] All {max_retries} attempts failed")
         
@@ -569,10 +570,9 @@ class DestinationResearchAgent:
         selected = list(result.activity_catalog or [])
         # Fill in missing trip_id and try to geocode coordinates for each activity.
         # If geocoding fails, default both to destination centroid for map visualization.
-        centroid = DestinationResearchAgent._resolve_destination_centroid(dest)
+        centroid = await asyncio.to_thread(DestinationResearchAgent._resolve_destination_centroid, dest)
         
         # Fetch photos for activities (async batch)
-        import asyncio
         photo_tasks = []
         for a in selected:
             if getattr(a, "trip_id", None) in (None, ""):
@@ -582,7 +582,7 @@ class DestinationResearchAgent:
             if lat_none or lng_none:
                 # Try to geocode the activity name scoped by destination
                 query = f"{getattr(a, 'name', '')}, {dest}".strip().strip(",")
-                coords = DestinationResearchAgent._geocode_place(query)
+                coords = await asyncio.to_thread(DestinationResearchAgent._geocode_place, query)
                 if coords is not None:
                     a.lat, a.lng = coords
                 elif centroid is not None:
@@ -6,6 +6,7 @@ from langgraph.graph import StateGraph, END
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+import asyncio
 import time
 import json
 from datetime import datetime, timedelta
@@ -104,6 +105,14 @@ Rules:
 - Return JSON only, with no surrounding prose or code fences.
 """
 
+# Built once: the system message is a stable prefix, only {payload} varies per call
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM),
+        ("user", "Input:\n{payload}\n\nReturn JSON only."),
+    ]
+)
+
 
 # ====== Agent Implementation ======
 
@@ -258,13 +267,6 @@ class ItineraryAgent:
         print(f"  - Activities in catalog: {len(payload['activity_catalog'])}")
         print(f"  - Trip duration: {payload['trip_duration_days']} days")
 
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", SYSTEM),
-                ("user", "Input:\n{payload}\n\nReturn JSON only."),
-            ]
-        )
-
         if self.llm is None:
             if self._llm_unavailable_reason:
                 print(f"[{AGENT_LABEL}] LLM unavailable: {self._llm_unavailable_reason}")
@@ -287,7 +289,7 @@ class ItineraryAgent:
         # SINGLE LLM CALL PER TRIP: Generate complete itinerary at once
         # This is the only LLM call in itinerary agent
         structured_llm = self.llm.with_structured_output(ItineraryOut)
-        run = prompt | structured_llm
+        run = PROMPT | structured_llm
         
         # Retry logic with timing (max 3 attempts = max 3 API calls)
         max_retries = 3
@@ -298,7 +300,7 @@ class ItineraryAgent:
             api_start = time.time()
             try:
                 print(f"[API] Calling OpenAI API for itinerary generation (attempt {attempt}/{max_retries})...")
-                result = run.invoke({"payload": payload})
+                result = await run.ainvoke({"payload": payload})
                 api_latency = (time.time() - api_start) * 1000
                 print(f"[API] ✅ OpenAI API call succeeded")
                 print(f"[PERF] API latency: {api_latency:.2f}ms")
@@ -321,7 +323,7 @@ class ItineraryAgent:
                 if attempt < max_retries:
                     retry_delay = 2 ** attempt
                     print(f"[RETRY] Waiting {retry_delay}s before retry...")
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
                 else:
                     print(f"[ERROR] All {max_retries} attempts failed")
         
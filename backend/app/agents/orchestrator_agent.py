@@ -419,15 +419,13 @@ async def destination_research_agent_wrapper(state: AgentState) -> AgentState:
     if activities and trip_id:
         try:
             from app.db.database import get_activities_collection
-            from app.models.activity import Activity
+            from pymongo import DeleteMany, InsertOne
+            from app.models.activity import activity_docs
             
             col = get_activities_collection()
             
-            # Clear existing activities for this trip
-            await col.delete_many({"trip_id": trip_id})
-            
-            # Convert activities to database documents
-            docs = []
+            # Convert activities to database documents (validated as one batch below)
+            records = []
             for a in activities:
                 try:
                     # Normalize to dict from either Pydantic model or plain dict
@@ -451,27 +449,31 @@ async def destination_research_agent_wrapper(state: AgentState) -> AgentState:
                             "rationale": getattr(a, "rationale", ""),
                             "photo_url": getattr(a, "photo_url", None),
                         }
-                    doc = Activity(
-                        trip_id=str(a_dict.get("trip_id") or trip_id),
-                        name=str(a_dict.get("name", "")),
-                        category=str(a_dict.get("category", "Other")),
-                        rough_cost=a_dict.get("rough_cost"),
-                        duration_min=a_dict.get("duration_min"),
-                        lat=a_dict.get("lat"),
-                        lng=a_dict.get("lng"),
-                        tags=list(a_dict.get("tags") or []),
-                        fits=list(a_dict.get("fits") or []),
-                        score=float(a_dict.get("score") or 0.0),
-                        rationale=str(a_dict.get("rationale") or ""),
-                        photo_url=a_dict.get("photo_url"),
-                    )
-                    docs.append(doc.model_dump())
+                    records.append({
+                        "trip_id": str(a_dict.get("trip_id") or trip_id),
+                        "name": str(a_dict.get("name", "")),
+                        "category": str(a_dict.get("category", "Other")),
+                        "rough_cost": a_dict.get("rough_cost"),
+                        "duration_min": a_dict.get("duration_min"),
+                        "lat": a_dict.get("lat"),
+                        "lng": a_dict.get("lng"),
+                        "tags": list(a_dict.get("tags") or []),
+                        "fits": list(a_dict.get("fits") or []),
+                        "score": float(a_dict.get("score") or 0.0),
+                        "rationale": str(a_dict.get("rationale") or ""),
+                        "photo_url": a_dict.get("photo_url"),
+                    })
                 except Exception as e:
                     print(f"[orchestrator] Skipping invalid activity: {e}")
+            docs = activity_docs(records)
+            
+            # Replace this trip's activities in one round-trip (ordered: delete runs first)
+            res = await col.bulk_write(
+                [DeleteMany({"trip_id": trip_id})] + [InsertOne(d) for d in docs], ordered=True
+            )
             
             if docs:
-                res = await col.insert_many(docs)
-                print(f"[orchestrator] ✅ Saved {len(res.inserted_ids)} activities to database for trip {trip_id}")
+                print(f"[orchestrator] ✅ Saved {res.inserted_count} activities to database for trip {trip_id}")
                 
                 # Broadcast a guaranteed 'completed' status so UI reflects completion
                 try:
@@ -482,7 +484,7 @@ async def destination_research_agent_wrapper(state: AgentState) -> AgentState:
                             "type": "agent_status",
                             "agent_name": "Destination Research Agent",
                             "status": "completed",
-                            "step": f"Generated {len(res.inserted_ids)} activity suggestions",
+                            "step": f"Generated {res.inserted_count} activity suggestions",
                             "timestamp": __import__('datetime').datetime.utcnow().isoformat(),
                             "progress": {"current": 4, "total": 4},
                         },
@@ -566,10 +568,9 @@ async def itinerary_agent_wrapper(state: AgentState) -> AgentState:
         agent_data = result.get("agent_data", {}) or {}
         itinerary_days = agent_data.get("itinerary") or []
         if trip_id and itinerary_days:
-            from app.db.database import get_itineraries_collection, get_database
+            from app.db.database import get_itineraries_collection, get_database, trip_lookup_filter
             from app.models.itinerary import Itinerary
             from datetime import datetime
-            from bson import ObjectId
 
             itineraries = get_itineraries_collection()
 
@@ -630,11 +631,7 @@ async def itinerary_agent_wrapper(state: AgentState) -> AgentState:
             try:
                 db = get_database()
                 trips = db.trips
-                trip_doc = None
-                try:
-                    trip_doc = await trips.find_one({"_id": ObjectId(trip_id)})
-                except Exception:
-                    trip_doc = await trips.find_one({"trip_code": str(trip_id).upper()})
+                trip_doc = await trips.find_one(trip_lookup_filter(str(trip_id)), {"phase_tracking": 1})
                 if trip_doc:
                     phases = (trip_doc.get("phase_tracking") or {}).get("phases", {}) or {}
                     ia = phases.get("itinerary_approval") or {}
@@ -704,15 +701,11 @@ async def consensus_agent_wrapper(state: AgentState) -> AgentState:
         # Consensus is waiting (voting_in_progress) - reload to get latest state
         trip_id = state.get("trip_id")
         if trip_id:
-            from app.db.database import get_database
-            from bson import ObjectId
+            from app.db.database import get_database, trip_lookup_filter
             db = get_database()
             trips = db.trips
             
-            try:
-                trip = await trips.find_one({"_id": ObjectId(trip_id)})
-            except:
-                trip = await trips.find_one({"trip_code": trip_id.upper()})
+            trip = await trips.find_one(trip_lookup_filter(trip_id), {"phase_tracking": 1})
             
             if trip:
                 phase_tracking = trip.get("phase_tracking")
@@ -1,10 +1,13 @@
 # preference_agent.py - Simplified agent for aggregation and semantic search
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import logging
 import math
 import time
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any
 
 from langchain_core.messages import AIMessage
@@ -15,10 +18,12 @@ from bson import ObjectId
 from app.agents.agent_state import AgentState
 from app.agents.tools import get_all_trip_preferences
 from app.models.preference import Preference
-from app.db.database import get_database
+from app.db.database import get_database, trip_lookup_filter
 
 AGENT_LABEL = "preference"
 
+logger = logging.getLogger(__name__)
+
 # ========== Vector Embedding Utilities ==========
 
 # Global embedding model (lazy-loaded)
@@ -59,6 +64,24 @@ def embed_text(text: str) -> list[float]:
     return _hash_embed_fallback(text, dim=384)
 
 
+def embed_texts(texts: list[str], batch_size: int = 32) -> list[list[float]]:
+    """
+    Embed many texts with one batched sentence-transformers call.
+    Falls back to hash-based embeddings if the model is not available.
+    """
+    if not texts:
+        return []
+    model = get_embedding_model()
+    if model is not None:
+        try:
+            embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            return embeddings.tolist()
+        except Exception as e:
+            print(f"[preference] Batch embedding error: {e}, falling back to hash")
+
+    return [_hash_embed_fallback(text, dim=384) for text in texts]
+
+
 def _hash_embed_fallback(text: str, dim: int = 384) -> list[float]:
     """Fallback hash-based embedding if sentence-transformers unavailable."""
     import hashlib
@@ -82,10 +105,58 @@ def cosine(a: list[float], b: list[float]) -> float:
     return sum(x * y for x, y in zip(a, b, strict=False))
 
 
+def normalize_deal_breakers(text: str) -> tuple[str, ...]:
+    """
+    Normalize deal breaker text into individual deal breakers.
+
+    Splits on commas/semicolons, trims whitespace, strips trailing punctuation.
+    """
+    if not text:
+        return ()
+    return _normalize_deal_breakers_cached(text)
+
+
+@lru_cache(maxsize=1024)
+def _normalize_deal_breakers_cached(text: str) -> tuple[str, ...]:
+    # Split on commas/semicolons; trim whitespace; strip trailing sentence punctuation
+    parts = [p.strip() for p in text.replace(";", ",").split(",") if p.strip()]
+    return tuple(p.rstrip(".!?:;").strip() for p in parts if p)
+
+
+def content_hash(summary: str, hard: dict[str, str], soft: dict[str, float]) -> str:
+    """Stable digest of the inputs that determine a profile's embedding and scores."""
+    raw = f"{summary}\x00{sorted(hard.items())}\x00{sorted(soft.items())}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def vec_key(trip_id: str, user_id: str) -> str:
+    """Vector index key for a user's preference profile."""
+    raw = f"{trip_id}:{user_id}:prefs"
+    short = hashlib.md5(raw.encode("utf-8")).hexdigest()[:6]
+    return f"vec_{short}"
+
+
+def preference_group_pipeline(trip_id: str) -> list[dict[str, Any]]:
+    """Aggregation pipeline that groups a trip's preferences into one document."""
+    return [
+        {"$match": {"trip_id": trip_id}},
+        {
+            "$group": {
+                "_id": "$trip_id",
+                "members": {"$push": "$user_id"},
+                "budgets": {"$push": "$budget_level"},
+                "deal_breakers": {"$push": "$deal_breaker"},
+                "vibes": {"$push": "$vibes"},
+            }
+        },
+    ]
+
+
 # ========== Data Models ==========
 
 
-@dataclass
+@dataclass(slots=True)
 class SurveyInput:
     """Input model for user preference survey."""
 
@@ -98,7 +169,7 @@ class SurveyInput:
     )  # weighted tags 0..1, e.g., {"adventure":0.9,"food":0.8,"nature":0.7}
 
 
-@dataclass
+@dataclass(slots=True)
 class UserPreferenceProfile:
     """Complete user preference profile with embedding."""
 
@@ -111,9 +182,10 @@ class UserPreferenceProfile:
     version: int = 1
     source: str = "db"
     updated_at: float = field(default_factory=lambda: time.time())
+    content_hash: str = ""  # hash of summary + hard + soft; unchanged input skips re-embedding
 
 
-@dataclass
+@dataclass(slots=True)
 class TripPreferenceAggregate:
     """Aggregated preferences for entire trip."""
 
@@ -126,7 +198,7 @@ class TripPreferenceAggregate:
     ready_for_options: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class ItemCandidate:
     """Candidate item for recommendation."""
 
@@ -135,7 +207,7 @@ class ItemCandidate:
     meta: dict[str, str] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class ScoredItem:
     """Item with similarity score."""
 
@@ -144,7 +216,7 @@ class ScoredItem:
     reason: str
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateDelta:
     """Represents changes made during an update."""
 
@@ -221,9 +293,7 @@ class PreferenceAgent:
 
     def _vec_key(self, trip_id: str, user_id: str) -> str:
         """Generate vector key."""
-        raw = f"{trip_id}:{user_id}:prefs"
-        short = hashlib.md5(raw.encode("utf-8")).hexdigest()[:6]
-        return f"vec_{short}"
+        return vec_key(trip_id, user_id)
 
     def _normalize_hard(self, pref: Preference) -> dict[str, str]:
         """Extract hard constraints from Preference model."""
@@ -249,12 +319,7 @@ class PreferenceAgent:
 
         Splits on commas/semicolons, trims whitespace, strips trailing punctuation.
         """
-        if not text:
-            return []
-        # Split on commas/semicolons; trim whitespace; strip trailing sentence punctuation
-        parts = [p.strip() for p in text.replace(";", ",").split(",") if p.strip()]
-        cleaned = [p.rstrip(".!?:;").strip() for p in parts if p]
-        return cleaned
+        return list(normalize_deal_breakers(text))
 
     def _summarize(self, pref: Preference) -> str:
         """Create text summary for embedding."""
@@ -309,20 +374,14 @@ class PreferenceAgent:
                 "done": True,
             }
 
-        print("\n" + "=" * 80)
-        print("  PREFERENCE AGENT START")
-        print("=" * 80)
-        print(f"[DEBUG] Trip ID: {trip_id}")
-        print(f"[PERF] Start timestamp: {time.time()}")
+        logger.debug("preference agent start: trip=%s", trip_id)
 
         try:
             # Fetch preferences from database (async tool)
             fetch_start = time.time()
-            print(f"[DB] Fetching preferences from database...")
             result = await get_all_trip_preferences.ainvoke({"trip_id": trip_id})
             fetch_latency = (time.time() - fetch_start) * 1000
-            print(f"[DB] ✅ Database fetch completed")
-            print(f"[PERF] Database fetch latency: {fetch_latency:.2f}ms")
+            logger.debug("preference fetch latency: %.2fms", fetch_latency)
 
             if "_error" in result:
                 return {
@@ -333,34 +392,47 @@ class PreferenceAgent:
                 }
 
             preferences_data = result.get("preferences", [])
-            print(f"[DEBUG] Found {len(preferences_data)} preferences in database")
-            print(f"[DEBUG] Input data sizes:")
-            print(f"  - Preference count: {len(preferences_data)}")
+            logger.debug("found %d preferences in database", len(preferences_data))
 
             # Convert to Preference models and create embeddings
             embed_start = time.time()
             profiles_created = 0
-            embedding_times = []
-            
-            print(f"[PROCESSING] Creating embeddings for {len(preferences_data)} preferences...")
+
+            # First pass: normalize every preference so all summaries can be embedded at once
+            parsed = []
             for idx, pref_dict in enumerate(preferences_data, 1):
                 try:
-                    item_start = time.time()
-                    
-                    # Create Preference model
-                    pref = Preference(**pref_dict)
-
-                    # Create profile with embedding
+                    # Create Preference model (documents were validated when the
+                    # preference endpoint wrote them, so skip re-validation)
+                    pref = Preference.model_construct(**pref_dict)
                     hard = self._normalize_hard(pref)
                     soft = self._normalize_soft(pref.vibes)
                     summary = self._summarize(pref)
-                    
-                    # Track embedding generation time
-                    emb_start = time.time()
-                    vec = embed_text(summary)
-                    emb_time = (time.time() - emb_start) * 1000
-                    embedding_times.append(emb_time)
-
+                    parsed.append((pref, hard, soft, summary, content_hash(summary, hard, soft)))
+                except Exception as e:
+                    logger.warning("failed to process preference %d/%d: %s: %s", idx, len(preferences_data), type(e).__name__, e)
+
+            # Unchanged preferences keep the vector from the previous run
+            vectors: list[list[float] | None] = []
+            to_embed: list[int] = []
+            for i, (pref, _, _, _, digest) in enumerate(parsed):
+                existing = self.profiles.get((trip_id, pref.user_id))
+                if existing is not None and existing.content_hash == digest:
+                    vectors.append(existing.vector)
+                else:
+                    vectors.append(None)
+                    to_embed.append(i)
+
+            logger.debug("creating embeddings for %d/%d preferences", len(to_embed), len(parsed))
+            emb_start = time.time()
+            # Encoding is CPU-bound; run it off the event loop so other requests keep flowing
+            fresh = await asyncio.to_thread(embed_texts, [parsed[i][3] for i in to_embed])
+            for i, vec in zip(to_embed, fresh, strict=True):
+                vectors[i] = vec
+            emb_total = (time.time() - emb_start) * 1000
+
+            for idx, ((pref, hard, soft, summary, digest), vec) in enumerate(zip(parsed, vectors, strict=True), 1):
+                try:
                     profile = UserPreferenceProfile(
                         trip_id=trip_id,
                         user_id=pref.user_id,
@@ -369,6 +441,7 @@ class PreferenceAgent:
                         summary=summary,
                         vector=vec,
                         source="db",
+                        content_hash=digest,
                     )
 
                     # Store profile
@@ -382,55 +455,40 @@ class PreferenceAgent:
                         self.trips[trip_id].append(pref.user_id)
 
                     profiles_created += 1
-                    item_latency = (time.time() - item_start) * 1000
-                    
-                    if idx % 5 == 0 or idx == len(preferences_data):  # Log every 5th or last
-                        print(f"[PROCESSING] Processed {idx}/{len(preferences_data)} preferences (last item: {item_latency:.2f}ms)")
 
                 except Exception as e:
-                    print(f"[ERROR] Failed to process preference {idx}/{len(preferences_data)}: {type(e).__name__}: {e}")
+                    logger.warning("failed to store preference %d/%d: %s: %s", idx, len(parsed), type(e).__name__, e)
                     continue
 
             embed_total_latency = (time.time() - embed_start) * 1000
-            avg_embedding_time = sum(embedding_times) / len(embedding_times) if embedding_times else 0
+            avg_embedding_time = emb_total / len(to_embed) if to_embed else 0
             
-            print(f"[PROCESSING] ✅ Created {profiles_created} profiles with embeddings")
-            print(f"[PERF] Total embedding generation time: {embed_total_latency:.2f}ms")
-            print(f"[PERF] Average embedding time per preference: {avg_embedding_time:.2f}ms")
+            logger.debug(
+                "created %d profiles; embedding total %.2fms, avg %.2fms per embedded preference",
+                profiles_created, embed_total_latency, avg_embedding_time,
+            )
 
             # Aggregate preferences
             agg_start = time.time()
-            print(f"[PROCESSING] Computing preference aggregation...")
             aggregate = self.aggregate(trip_id)
             agg_latency = (time.time() - agg_start) * 1000
-            print(f"[PERF] Aggregation latency: {agg_latency:.2f}ms")
-
-            # Log detailed aggregation results
-            print("\n" + "=" * 80)
-            print("  PREFERENCE AGENT COMPLETE")
-            print("=" * 80)
-            print(f"[RESULT] Trip: {trip_id}")
-            print(f"[RESULT] Members: {len(aggregate.members)}")
-            print(f"[RESULT] Coverage: {aggregate.coverage:.0%} ({len(aggregate.members)} members)")
-            print(f"[RESULT] Ready for planning: {aggregate.ready_for_options}")
-            
-            if aggregate.soft_mean:
-                top_vibes = dict(sorted(aggregate.soft_mean.items(), key=lambda x: -x[1])[:5])
-                print(f"[RESULT] Top 5 vibes:")
-                for vibe, score in top_vibes.items():
-                    print(f"  - {vibe}: {score:.2f}")
-            
-            budget_levels = aggregate.hard_union.get("budget_level", [])
-            if budget_levels:
-                print(f"[RESULT] Budget levels: {budget_levels}")
-            
+
+            # Detailed aggregation results (only built when debug logging is on)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "preference agent complete: trip=%s members=%d coverage=%.0f%% ready=%s "
+                    "top_vibes=%s budget_levels=%s aggregation=%.2fms total=%.2fms",
+                    trip_id,
+                    len(aggregate.members),
+                    aggregate.coverage * 100,
+                    aggregate.ready_for_options,
+                    dict(sorted(aggregate.soft_mean.items(), key=lambda x: -x[1])[:5]),
+                    aggregate.hard_union.get("budget_level", []),
+                    agg_latency,
+                    (time.time() - t0) * 1000,
+                )
             if aggregate.conflicts:
-                print(f"[WARN] Conflicts detected:")
-                for key, reason in aggregate.conflicts:
-                    print(f"  - {key}: {reason}")
-            
-            total_latency = (time.time() - t0) * 1000
-            print(f"[PERF] Total preference agent latency: {total_latency:.2f}ms ({total_latency/1000:.2f}s)")
+                logger.warning("preference conflicts for trip %s: %s", trip_id, aggregate.conflicts)
             
             summary_msg = f"""
                 [preference] Processing complete for trip {trip_id}:
@@ -612,6 +670,67 @@ class PreferenceAgent:
             trip_id, members, hard_union, soft_mean, conflicts, coverage, ready
         )
 
+    async def aggregate_from_db(self, trip_id: str) -> TripPreferenceAggregate:
+        """
+        Aggregate all preferences for a trip directly from MongoDB.
+
+        The preferences are grouped server-side into a single document, so this
+        does not depend on in-memory profiles and works on any worker.
+
+        Args:
+            trip_id: Trip identifier
+
+        Returns:
+            TripPreferenceAggregate with combined preferences
+        """
+        pipeline = preference_group_pipeline(trip_id)
+        db = get_database()
+        # The trip's member list is needed for coverage; read it alongside the $group
+        grouped, trip_doc = await asyncio.gather(
+            db.preferences.aggregate(pipeline).to_list(length=1),
+            db.trips.find_one(trip_lookup_filter(trip_id), {"members": 1}),
+        )
+        if not grouped:
+            return TripPreferenceAggregate(trip_id, [], {}, {}, [], 0.0, False)
+        row = grouped[0]
+
+        hard_union: dict[str, list[str]] = {}
+        for key, values in (
+            ("budget_level", row["budgets"]),
+            ("deal_breaker", row["deal_breakers"]),
+        ):
+            for v in values:
+                if not v:
+                    continue
+                v = str(v) if key == "budget_level" else v
+                hard_union.setdefault(key, [])
+                if v not in hard_union[key]:
+                    hard_union[key].append(v)
+
+        soft_accum: dict[str, float] = {}
+        soft_count: dict[str, int] = {}
+        for vibes in row["vibes"]:
+            for k, v in self._normalize_soft(vibes or []).items():
+                soft_accum[k] = soft_accum.get(k, 0.0) + v
+                soft_count[k] = soft_count.get(k, 0) + 1
+
+        members = list(dict.fromkeys(row["members"]))
+        soft_mean = {k: soft_accum[k] / soft_count[k] for k in soft_accum}
+        conflicts = self._detect_conflicts(hard_union)
+        # Coverage is measured against everyone on the trip, not just those who submitted
+        trip_members = (trip_doc or {}).get("members") or members
+        submitted = set(members)
+        coverage = (
+            len([uid for uid in trip_members if uid in submitted]) / len(trip_members)
+            if trip_members
+            else 0.0
+        )
+        ready = coverage >= 0.8 and not conflicts
+
+        return TripPreferenceAggregate(
+            trip_id, members, hard_union, soft_mean, conflicts, coverage, ready
+        )
+
     def ingest_survey(
         self, trip_id: str, user_id: str, survey: SurveyInput
     ) -> UserPreferenceProfile:
@@ -631,6 +750,13 @@ class PreferenceAgent:
         soft = survey.soft.copy() if survey.soft else {}
         summary = survey.text or ""
 
+        # Re-submitting an unchanged survey keeps the existing profile and embedding
+        key = (trip_id, user_id)
+        digest = content_hash(summary, hard, soft)
+        existing = self.profiles.get(key)
+        if existing is not None and existing.content_hash == digest:
+            return existing
+
         # Create embedding
         vec = embed_text(summary)
 
@@ -643,10 +769,10 @@ class PreferenceAgent:
             summary=summary,
             vector=vec,
             source="survey",
+            content_hash=digest,
         )
 
         # Store profile
-        key = (trip_id, user_id)
         self.profiles[key] = profile
         self.index.upsert(self._vec_key(trip_id, user_id), vec)
 
@@ -693,6 +819,10 @@ class PreferenceAgent:
                 except ValueError:
                     pass
 
+        # Profile no longer matches its source survey, so the next ingest must rebuild it
+        if changed:
+            profile.content_hash = ""
+
         # Update profile version and timestamp
         profile.version += 1
         profile.updated_at = time.time()
@@ -742,8 +872,8 @@ class PreferenceAgent:
 
         # Score items
         scored: list[ScoredItem] = []
-        for it in items:
-            vec = embed_text(it.text)
+        vectors = embed_texts([it.text for it in items])
+        for it, vec in zip(items, vectors, strict=True):
             s = cosine(trip_vec, vec)
             scored.append(ScoredItem(id=it.id, score=float(s), reason="semantic match"))
 
@@ -782,6 +912,11 @@ __all__ = [
     "ItemCandidate",
     "VectorIndex",
     "embed_text",
+    "embed_texts",
+    "normalize_deal_breakers",
+    "content_hash",
+    "vec_key",
+    "preference_group_pipeline",
     "cosine",
     "get_embedding_model",
     "UserPreferenceProfile",
@@ -3,6 +3,19 @@ from langchain_core.tools import tool
 
 from app.db.database import get_preferences_collection
 
+# Preference fields the agents consume (skips _id and timestamps)
+_PREFERENCE_PROJECTION = {
+    "_id": 0,
+    "trip_id": 1,
+    "user_id": 1,
+    "destination": 1,
+    "budget_level": 1,
+    "vibes": 1,
+    "deal_breaker": 1,
+    "notes": 1,
+    "available_dates": 1,
+}
+
 
 @tool
 async def get_all_trip_preferences(trip_id: str) -> dict[str, Any]:
@@ -17,12 +30,10 @@ async def get_all_trip_preferences(trip_id: str) -> dict[str, Any]:
     """
     try:
         col = get_preferences_collection()
-        preferences = await col.find({"trip_id": trip_id}).to_list(length=None)
-
-        # Convert ObjectId to string
-        for pref in preferences:
-            if "_id" in pref:
-                pref["_id"] = str(pref["_id"])
+        # Served by the (trip_id, user_id) index; only the preference fields are read
+        preferences = await col.find(
+            {"trip_id": trip_id}, _PREFERENCE_PROJECTION
+        ).to_list(length=None)
 
         return {"trip_id": trip_id, "preferences": preferences, "count": len(preferences)}
 
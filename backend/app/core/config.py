@@ -79,6 +79,7 @@ def _get_int_env(var_name: str, default_value: int) -> int:
 
 SERVER_PORT = _get_int_env("SERVER_PORT", 8060)
 DEBUG = os.environ.get("DEBUG", "true").lower() == "true"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 
 
 # === CORS Configuration ===
@@ -100,6 +101,13 @@ CORS_ORIGINS = _get_cors_origins()
 # === Database Configuration ===
 MONGODB_URI = os.environ.get("MONGODB_URI")
 DATABASE_NAME = os.environ.get("DATABASE_NAME", "travel_planner")
+# Connection pool sizing (shared by all requests, broadcasts and background flushes)
+MONGODB_MAX_POOL_SIZE = _get_int_env("MONGODB_MAX_POOL_SIZE", 100)
+MONGODB_MIN_POOL_SIZE = _get_int_env("MONGODB_MIN_POOL_SIZE", 10)
+MONGODB_MAX_IDLE_TIME_MS = _get_int_env("MONGODB_MAX_IDLE_TIME_MS", 60000)
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = _get_int_env("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 3000)
+# Optional wire compression, e.g. "zstd,snappy,zlib" (zstd/snappy need their extra packages)
+MONGODB_COMPRESSORS = os.environ.get("MONGODB_COMPRESSORS", "").strip()
 
 # === Google OAuth Configuration ===
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
@@ -0,0 +1,115 @@
+"""
+In-memory response caches for LLM calls.
+
+ExactResponseCache returns a previously generated answer for a byte-identical
+prompt (SHA-256 of model + messages), with no embedding cost.
+SemanticResponseCache returns a previously generated answer when a new prompt
+embeds close enough (cosine similarity >= threshold) to one already answered
+within the same scope (e.g. model + conversation history). Entries expire
+after a TTL and both caches are size-bounded.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+
+# Defaults: 4h TTL, similarity threshold 0.9
+DEFAULT_TTL_SECONDS = 4 * 60 * 60
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MAXSIZE = 256
+
+
+def _default_embed(text: str) -> list[float]:
+    """Embed with the shared preference embedding model (lazy import)."""
+    from app.agents.preference_agent import embed_text
+
+    return embed_text(text)
+
+
+def prompt_hash(llm_string: str, messages: Iterable[tuple[str, str]]) -> str:
+    """Stable SHA-256 key for a model name and a sequence of (role, content) pairs."""
+    payload = json.dumps([llm_string, list(messages)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExactResponseCache:
+    """TTL + LRU cache of responses keyed on prompt_hash()."""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, maxsize: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        self._entries[key] = (response, time.time() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SemanticResponseCache:
+    """
+    Semantic cache keyed on prompt embeddings.
+
+    Vectors are expected to be L2-normalized (as produced by embed_text),
+    so the dot product is the cosine similarity.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        maxsize: int = DEFAULT_MAXSIZE,
+        embed_fn: Callable[[str], list[float]] | None = None,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._embed_fn = embed_fn or _default_embed
+        # (vector, scope, response, expires_at), oldest first
+        self._entries: list[tuple[list[float], str, str, float]] = []
+
+    def embed(self, text: str) -> list[float]:
+        """Embed a prompt key (blocking; run in a thread from async code)."""
+        return self._embed_fn(text)
+
+    def lookup(self, vector: list[float], scope: str) -> str | None:
+        """Return the cached response in scope most similar to vector, if above threshold."""
+        now = time.time()
+        self._entries = [e for e in self._entries if e[3] > now]
+
+        best_score = self.threshold
+        best_response = None
+        for vec, entry_scope, response, _ in self._entries:
+            if entry_scope != scope:
+                continue
+            score = sum(x * y for x, y in zip(vector, vec, strict=False))
+            if score >= best_score:
+                best_score = score
+                best_response = response
+        return best_response
+
+    def update(self, vector: list[float], scope: str, response: str) -> None:
+        """Store a response for the given prompt vector within scope."""
+        self._entries.append((vector, scope, response, time.time() + self.ttl_seconds))
+        if len(self._entries) > self.maxsize:
+            del self._entries[: len(self._entries) - self.maxsize]
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,35 @@
+"""
+Logging setup.
+
+Records are handed to a QueueHandler on the calling thread and formatted and
+written by a QueueListener on a background thread, so logging from request
+handlers and WebSocket loops never blocks the event loop on stdout.
+"""
+
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core.config import LOG_LEVEL
+
+_LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+def setup_logging() -> QueueListener:
+    """
+    Route the root logger through a queue and return the (unstarted) listener.
+    The caller starts it on startup and stops it on shutdown to flush records.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+    # LOG_LEVEL only applies to our own modules so DEBUG does not turn on
+    # pymongo, httpx and asyncio debug output
+    logging.getLogger("app").setLevel(LOG_LEVEL)
+
+    return QueueListener(log_queue, stream_handler, respect_handler_level=True)
@@ -2,10 +2,19 @@
 MongoDB Database Configuration and Connection
 """
 
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.server_api import ServerApi
 
-from app.core.config import DATABASE_NAME, MONGODB_URI
+from app.core.config import (
+    DATABASE_NAME,
+    MONGODB_COMPRESSORS,
+    MONGODB_MAX_IDLE_TIME_MS,
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_MIN_POOL_SIZE,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_URI,
+)
 
 # Global database client
 _client = None
@@ -23,8 +32,21 @@ def get_database():
         if not MONGODB_URI:
             raise ValueError("MONGODB_URI environment variable is not set")
 
-        # Create MongoDB client with server API version
-        _client = AsyncIOMotorClient(MONGODB_URI, server_api=ServerApi("1"))
+        # Create MongoDB client with server API version and a pool sized for
+        # concurrent requests, so checkouts don't serialize under bursts
+        options = {}
+        if MONGODB_COMPRESSORS:
+            options["compressors"] = MONGODB_COMPRESSORS
+        _client = AsyncIOMotorClient(
+            MONGODB_URI,
+            server_api=ServerApi("1"),
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            retryWrites=True,
+            **options,
+        )
         _database = _client[DATABASE_NAME]
 
         print(f"✅ Connected to MongoDB database: {DATABASE_NAME}")
@@ -42,6 +64,7 @@ async def init_indexes():
         activities_collection = get_activities_collection()
         trips_collection = get_trips_collection()
         itineraries_collection = get_itineraries_collection()
+        messages_collection = get_messages_collection()
 
         # Users indexes
         await users_collection.create_index("google_id", unique=True)
@@ -57,6 +80,9 @@ async def init_indexes():
         # Activities indexes
         await activities_collection.create_index("trip_id")
         await activities_collection.create_index("category")
+        await activities_collection.create_index([("trip_id", 1), ("name", 1)], name="trip_name")
+        await activities_collection.create_index([("trip_id", 1), ("name_lower", 1)], name="trip_name_lower")
+        await activities_collection.create_index([("trip_id", 1), ("score", -1)], name="trip_score")
 
         # Trips indexes
         await trips_collection.create_index("trip_code", unique=True)
@@ -68,6 +94,14 @@ async def init_indexes():
         await itineraries_collection.create_index([("trip_id", 1), ("status", 1)], name="trip_status")
         await itineraries_collection.create_index([("trip_id", 1), ("days.date", 1)], name="trip_day_date")
 
+        # Messages indexes
+        await messages_collection.create_index([("chatId", 1), ("createdAt", 1)], name="chat_created")
+        await messages_collection.create_index(
+            [("chatId", 1), ("type", 1), ("phase", 1)],
+            name="chat_voting_phase",
+            partialFilterExpression={"type": "voting"},
+        )
+
         print("✅ Database indexes created successfully")
     except Exception as e:
         print(f"⚠️  Index creation warning: {e}")
@@ -140,3 +174,23 @@ def get_itineraries_collection():
     """
     db = get_database()
     return db.itineraries
+
+
+def get_messages_collection():
+    """
+    Get the chat messages collection from the database
+    """
+    db = get_database()
+    return db.messages
+
+
+def trip_lookup_filter(trip_id: str) -> dict:
+    """
+    Build the trips query for an id that may be an ObjectId string or a trip code.
+    An ObjectId-shaped id may still be a code, so it matches either field
+    (both are indexed, so this stays a single indexed query).
+    """
+    code_filter = {"trip_code": trip_id.upper()}
+    if ObjectId.is_valid(trip_id):
+        return {"$or": [{"_id": ObjectId(trip_id)}, code_filter]}
+    return code_filter
@@ -1,9 +1,12 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.core.config import APP_NAME, CORS_ORIGINS, SERVER_HOST, SERVER_PORT
+from app.core.log import setup_logging
 from app.db.database import close_database_connection, init_indexes, test_connection
 from app.router.activity import router as activity_router
 from app.router.auth import router as auth_router
@@ -11,23 +14,33 @@ from app.router.trip import router as trip_router
 from app.router.perference import router as preference_router
 from app.router.system import router as system_router
 from app.router.chatbot import router as chat_router
-from app.router.chat import router as ws_chat_router
-from app.router.location import router as location_router
+from app.router.chat import router as ws_chat_router, run_broadcast_worker, run_message_flusher
+from app.router.location import router as location_router, close_http_client
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Test database connection
+    # Startup: Route logging through a background listener, then test database connection
+    log_listener = setup_logging()
+    log_listener.start()
     print("🚀 Starting up Travel Planner API...")
     await test_connection()
     await init_indexes()
+    broadcast_worker = asyncio.create_task(run_broadcast_worker())
+    message_flusher = asyncio.create_task(run_message_flusher())
     yield
-    # Shutdown: Close database connection
+    # Shutdown: Stop background workers and close database connection
     print("🛑 Shutting down Travel Planner API...")
+    broadcast_worker.cancel()
+    message_flusher.cancel()
+    await asyncio.gather(message_flusher, return_exceptions=True)  # final flush
+    await close_http_client()
     await close_database_connection()
+    log_listener.stop()
 
 
-app = FastAPI(title=APP_NAME, lifespan=lifespan)
+# orjson encodes response bodies (message history, aggregates) much faster than stdlib json
+app = FastAPI(title=APP_NAME, lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
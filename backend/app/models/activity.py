@@ -2,10 +2,13 @@
 Activity model for MongoDB persistence
 """
 
+import logging
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
 
 
 class Activity(BaseModel):
@@ -62,3 +65,29 @@ class Activity(BaseModel):
                 "net_score": 0,
             }
         }
+
+
+# Batch validator/serializer: one pydantic-core call for a whole catalog
+_ACTIVITY_LIST = TypeAdapter(list[Activity])
+
+
+def activity_docs(records: list[dict]) -> list[dict]:
+    """
+    Validate activity records and return MongoDB documents.
+    The whole list is validated in one call; if any record is invalid, records
+    are validated one by one and the invalid ones are skipped.
+    Documents also get name_lower, a storage-only field for indexed name lookups
+    that is not part of the API model.
+    """
+    try:
+        docs = _ACTIVITY_LIST.dump_python(_ACTIVITY_LIST.validate_python(records))
+    except ValidationError:
+        docs = []
+        for record in records:
+            try:
+                docs.append(Activity.model_validate(record).model_dump())
+            except ValidationError as e:
+                logger.warning("Skipping invalid activity record: %s", e)
+    for doc in docs:
+        doc["name_lower"] = doc["name"].lower()
+    return docs
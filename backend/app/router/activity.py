@@ -3,13 +3,39 @@ Activity Router
 Provides endpoints for managing and retrieving activities
 """
 
+import logging
+from datetime import datetime
+
 from fastapi import APIRouter, HTTPException, Query
+from pymongo import ReturnDocument
 
 from app.db.database import get_activities_collection
 from app.models.activity import Activity
 from app.models.common import APIResponse
 
 router = APIRouter(prefix="/activities", tags=["Activities"])
+logger = logging.getLogger(__name__)
+
+
+def _count_votes(value: str) -> dict:
+    """Aggregation expression counting entries of the votes map equal to value."""
+    return {
+        "$size": {
+            "$filter": {
+                "input": {"$objectToArray": {"$ifNull": ["$votes", {}]}},
+                "cond": {"$eq": ["$$this.v", value]},
+            }
+        }
+    }
+
+
+# Pipeline stage recomputing vote tallies from the votes map
+_VOTE_TALLY_STAGE = {
+    "$set": {
+        "upvote_count": _count_votes("up"),
+        "downvote_count": _count_votes("down"),
+    }
+}
 
 
 @router.get("/", response_model=APIResponse)
@@ -44,13 +70,13 @@ async def get_activities(
                 activity = Activity(**doc)
                 result.append(activity)
             except Exception as e:
-                print(f"Warning: Could not parse activity document: {e}")
+                logger.warning("Could not parse activity document: %s", e)
                 continue
 
         return APIResponse(code=0, msg="ok", data=result)
 
     except Exception as e:
-        print(f"Error fetching activities: {e}")
+        logger.exception("Error fetching activities: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve activities: {str(e)}")
 
 
@@ -68,51 +94,40 @@ async def vote_activity(
     try:
         col = get_activities_collection()
         
-        # Find activity
-        activity = await col.find_one({
-            "trip_id": trip_id,
-            "name": activity_name
-        })
-        
-        if not activity:
-            raise HTTPException(status_code=404, detail=f"Activity '{activity_name}' not found")
-        
-        # Get existing votes dict
-        votes = activity.get("votes", {})
-        
-        # Update vote
-        if vote == "up":
-            votes[user_id] = "up"
-        elif vote == "down":
-            votes[user_id] = "down"
+        # Apply the vote to the per-user map
+        if vote in ("up", "down"):
+            vote_stage = {"$set": {f"votes.{user_id}": vote}}
         else:
             # Invalid vote, remove if exists (neutral)
-            votes.pop(user_id, None)
-        
-        # Calculate scores
-        upvote_count = sum(1 for v in votes.values() if v == "up")
-        downvote_count = sum(1 for v in votes.values() if v == "down")
-        net_score = upvote_count - downvote_count
+            vote_stage = {"$unset": f"votes.{user_id}"}
         
-        # Update activity in database
-        from datetime import datetime
-        await col.update_one(
+        # Update the vote and recompute the tallies server-side in one atomic round-trip
+        activity = await col.find_one_and_update(
             {"trip_id": trip_id, "name": activity_name},
-            {
-                "$set": {
-                    "votes": votes,
-                    "upvote_count": upvote_count,
-                    "downvote_count": downvote_count,
-                    "net_score": net_score,
-                    "updated_at": datetime.utcnow()
-                }
-            }
+            [
+                vote_stage,
+                _VOTE_TALLY_STAGE,
+                {
+                    "$set": {
+                        "net_score": {"$subtract": ["$upvote_count", "$downvote_count"]},
+                        "updated_at": datetime.utcnow(),
+                    }
+                },
+            ],
+            projection={"_id": 0, "upvote_count": 1, "downvote_count": 1, "net_score": 1},
+            return_document=ReturnDocument.AFTER,
         )
         
-        # Broadcast vote update via WebSocket (non-blocking)
-        from app.router.chat import broadcast_to_chat
-        import asyncio
-        asyncio.create_task(broadcast_to_chat(trip_id, {
+        if not activity:
+            raise HTTPException(status_code=404, detail=f"Activity '{activity_name}' not found")
+        
+        upvote_count = activity["upvote_count"]
+        downvote_count = activity["downvote_count"]
+        net_score = activity["net_score"]
+        
+        # Broadcast vote update via WebSocket (queued, non-blocking)
+        from app.router.chat import enqueue_broadcast
+        enqueue_broadcast(trip_id, {
             "type": "activity_vote_update",
             "activity_name": activity_name,
             "user_id": user_id,
@@ -120,8 +135,7 @@ async def vote_activity(
             "upvote_count": upvote_count,
             "downvote_count": downvote_count,
             "net_score": net_score,
-            "timestamp": datetime.utcnow().isoformat()
-        }))
+        })
         
         return APIResponse(
             code=0,
@@ -138,5 +152,5 @@ async def vote_activity(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[vote_activity] Error: {e}")
+        logger.exception("vote_activity failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to record vote: {str(e)}")
\ No newline at end of file
@@ -18,7 +18,6 @@ from app.core.config import (
 )
 from app.db.database import get_users_collection
 from app.models.common import APIResponse
-from app.models.user import User
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer()
@@ -103,65 +102,42 @@ async def google_auth(
             "email_verified": google_user.get("verified_email", False),
         }
 
-        # Step 4: Create or update user in MongoDB using User model
+        # Step 4: Create or update user in MongoDB
         users_collection = get_users_collection()
 
-        # Check if user already exists
-        existing_user = await users_collection.find_one({"google_id": user_info["id"]})
-
         current_time = datetime.utcnow()
 
-        if existing_user:
-            # Update existing user using User model for validation
-            user_doc = User(
-                google_id=user_info["id"],
-                email=user_info["email"],
-                name=user_info["name"],
-                given_name=user_info.get("given_name"),
-                family_name=user_info.get("family_name"),
-                picture=user_info.get("picture"),
-                email_verified=user_info.get("email_verified", False),
-                created_at=existing_user.get("created_at", current_time),
-                updated_at=current_time,
-                last_login=current_time,
-            )
-
-            update_result = await users_collection.update_one(
-                {"google_id": user_info["id"]},
-                {"$set": user_doc.model_dump(exclude={"created_at"})},
-            )
-            print("💾 DATABASE OPERATION:")
-            print("=" * 50)
-            print("Operation: UPDATE")
-            print(f"Modified Count: {update_result.modified_count}")
-            print(f"Google ID: {user_info['id']}")
-            print(f"Email: {user_info['email']}")
-            print(f"Name: {user_info['name']}")
-            print("=" * 50 + "\n")
-        else:
-            # Create new user using User model
-            user_doc = User(
-                google_id=user_info["id"],
-                email=user_info["email"],
-                name=user_info["name"],
-                given_name=user_info.get("given_name"),
-                family_name=user_info.get("family_name"),
-                picture=user_info.get("picture"),
-                email_verified=user_info.get("email_verified", False),
-                created_at=current_time,
-                updated_at=current_time,
-                last_login=current_time,
-            )
+        # Data comes straight from Google's verified userinfo endpoint, so write a
+        # plain dict in a single upsert instead of validating through the User model
+        user_fields = {
+            "google_id": user_info["id"],
+            "email": user_info["email"],
+            "name": user_info["name"],
+            "given_name": user_info.get("given_name"),
+            "family_name": user_info.get("family_name"),
+            "picture": user_info.get("picture"),
+            "email_verified": user_info.get("email_verified", False),
+            "updated_at": current_time,
+            "last_login": current_time,
+        }
 
-            insert_result = await users_collection.insert_one(user_doc.model_dump())
-            print("💾 DATABASE OPERATION:")
-            print("=" * 50)
+        upsert_result = await users_collection.update_one(
+            {"google_id": user_info["id"]},
+            {"$set": user_fields, "$setOnInsert": {"created_at": current_time}},
+            upsert=True,
+        )
+        print("💾 DATABASE OPERATION:")
+        print("=" * 50)
+        if upsert_result.upserted_id is not None:
             print("Operation: CREATE")
-            print(f"Inserted ID: {insert_result.inserted_id}")
-            print(f"Google ID: {user_info['id']}")
-            print(f"Email: {user_info['email']}")
-            print(f"Name: {user_info['name']}")
-            print("=" * 50 + "\n")
+            print(f"Inserted ID: {upsert_result.upserted_id}")
+        else:
+            print("Operation: UPDATE")
+            print(f"Modified Count: {upsert_result.modified_count}")
+        print(f"Google ID: {user_info['id']}")
+        print(f"Email: {user_info['email']}")
+        print(f"Name: {user_info['name']}")
+        print("=" * 50 + "\n")
 
         # Step 5: Generate JWT token for our application
         jwt_payload = {
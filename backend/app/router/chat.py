@@ -1,9 +1,50 @@
+import asyncio
+import logging
+import re
+import time
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query
-from typing import Dict, List
+from dataclasses import dataclass, field
 from datetime import datetime
-from app.db.database import get_database
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+from app.db.database import get_activities_collection, get_database, trip_lookup_filter
 from app.models.common import APIResponse
 
+logger = logging.getLogger(__name__)
+
+
+def _dumps(payload: dict) -> str:
+    # orjson is a hard dependency (also backs the app's ORJSONResponse default)
+    return orjson.dumps(payload, default=str).decode()
+
+
+_loads = orjson.loads
+
+# Short-lived cache of trip {_id, members} keyed by the id/code chat handlers receive.
+# Bursts of reactions and change requests on one trip then cost a single lookup.
+_TRIP_CACHE_TTL_SECONDS = 5.0
+_TRIP_CACHE_MAXSIZE = 1024
+_trip_cache: dict[str, tuple] = {}
+
+
+async def _get_trip(trip_id: str):
+    """Return the trip's _id and members, served from _trip_cache when fresh."""
+    now = time.monotonic()
+    cached = _trip_cache.get(trip_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    trip = await get_database().trips.find_one(trip_lookup_filter(trip_id), {"members": 1})
+    if trip:
+        if len(_trip_cache) >= _TRIP_CACHE_MAXSIZE:
+            _trip_cache.clear()
+        _trip_cache[trip_id] = (now + _TRIP_CACHE_TTL_SECONDS, trip)
+    return trip
+
+
 async def handle_heyai_command(message: str, user_id: str, trip_id: str):
     """
     Handle heyAI commands from chat.
@@ -15,14 +56,34 @@ async def handle_heyai_command(message: str, user_id: str, trip_id: str):
     if not command:
         return
     
+    # Don't put a command up for a vote if it can't be carried out
+    if parse_change_command(command) is None:
+        await broadcast_to_chat(trip_id, {
+            "senderId": "system",
+            "senderName": "AI Assistant",
+            "content": _not_understood_reply(command),
+            "type": "ai",
+            "timestamp": datetime.utcnow()
+        })
+        return
+    
     db = get_database()
     messages_collection = db.messages
     users_collection = db.users
     
     # Get user name
-    user = await users_collection.find_one({"google_id": user_id})
+    user = await users_collection.find_one({"google_id": user_id}, {"name": 1, "_id": 0})
     user_name = user.get("name", "Someone") if user else "Someone"
     
+    # Fix the majority threshold at creation so reactions don't need the trip.
+    # Without the trip there is no member count, so refuse rather than default to 1.
+    trip = await _get_trip(trip_id)
+    if not trip:
+        logger.warning("heyAI command for unknown trip %s ignored", trip_id)
+        return
+    total_members = len(trip.get("members", []))
+    approvals_needed = (total_members // 2) + 1  # Simple majority
+    
     # Create change request message
     request_msg = {
         "chatId": trip_id,
@@ -35,7 +96,7 @@ async def handle_heyai_command(message: str, user_id: str, trip_id: str):
             "command": command,
             "reactions": {},  # user_id: emoji
             "status": "pending",
-            "approvals_needed": 0,  # Will be calculated based on trip members
+            "approvals_needed": approvals_needed,
             "approvals_current": 0
         },
         "createdAt": datetime.utcnow()
@@ -49,7 +110,7 @@ async def handle_heyai_command(message: str, user_id: str, trip_id: str):
     request_msg["_id"] = message_id
     request_msg["message_id"] = message_id
     
-    # Broadcast to all clients
+    # Broadcast to all clients (already persisted above, so skip the second write)
     await broadcast_to_chat(trip_id, {
         "senderId": "system",
         "senderName": "AI Assistant",
@@ -57,169 +118,454 @@ async def handle_heyai_command(message: str, user_id: str, trip_id: str):
         "type": "change_request",
         "message_id": message_id,
         "change_data": request_msg["change_data"],
-        "timestamp": datetime.utcnow().isoformat()
-    })
+        "timestamp": datetime.utcnow()
+    }, persist=False)
+
+# heyAI change commands, checked in priority order: destination > remove > add/suggest.
+# (kind, keyword that claims the command, pattern extracting its argument or None)
+_COMMAND_RULES = (
+    (
+        "dest",
+        re.compile(r"\bdestination\b", re.IGNORECASE),
+        re.compile(r"\bdestination\s+to\s+(?P<arg>.+)", re.IGNORECASE | re.DOTALL),
+    ),
+    (
+        "act",
+        re.compile(r"\bremove\b", re.IGNORECASE),
+        re.compile(r"\bremove\s+(?P<arg>.+)", re.IGNORECASE | re.DOTALL),
+    ),
+    ("add", re.compile(r"\b(?:add|suggest)\b", re.IGNORECASE), None),
+)
+
+
+def parse_change_command(command: str) -> tuple[str, str] | None:
+    """
+    Return (kind, argument) for a heyAI change command, or None if it is not understood.
+    The highest-priority keyword present decides the command; if its argument is
+    missing (e.g. "destination" without "to <place>") the command is not understood.
+    """
+    for kind, keyword, arg_re in _COMMAND_RULES:
+        if not keyword.search(command):
+            continue
+        if arg_re is None:
+            return kind, command
+        match = arg_re.search(command)
+        arg = match["arg"].strip() if match else ""
+        return (kind, arg) if arg else None
+    return None
+
+
+def _not_understood_reply(command: str) -> str:
+    return (
+        f"🤔 I didn't understand: {command}\n\n"
+        'Try "destination to <place>", "remove <activity>" or "add <idea>".'
+    )
+
+
+async def _change_destination(trip: dict, trip_id: str, arg: str, command: str) -> str:
+    new_dest = arg
+    await get_database().trips.update_one(
+        {"_id": trip["_id"]},
+        {"$set": {"destination": new_dest, "updated_at": datetime.utcnow()}}
+    )
+    return f"✅ Destination changed to: {new_dest}"
+
+
+async def _remove_activity(trip: dict, trip_id: str, arg: str, command: str) -> str:
+    activity_name = arg
+    col = get_activities_collection()
+    # Anchored prefix on the lower-cased name can use the (trip_id, name_lower) index
+    pattern = re.escape(activity_name.lower())
+    result = await col.delete_one({"trip_id": trip_id, "name_lower": {"$regex": f"^{pattern}"}})
+    if not result.deleted_count:
+        # Activities saved before name_lower existed
+        result = await col.delete_one({"trip_id": trip_id, "name": {"$regex": re.escape(activity_name), "$options": "i"}})
+    
+    if result.deleted_count > 0:
+        return f"Removed activity: {activity_name}"
+    return f"Could not find activity: {activity_name}"
+
+
+async def _acknowledge_add(trip: dict, trip_id: str, arg: str, command: str) -> str:
+    # For now, just acknowledge
+    return f"I'll work on: {command}\n\n(Full implementation coming soon)"
+
+
+# Dispatch on the parsed command kind; each handler returns the reply text
+_COMMAND_HANDLERS = {
+    "dest": _change_destination,
+    "act": _remove_activity,
+    "add": _acknowledge_add,
+}
 
 async def execute_change_request(trip_id: str, command: str, requested_by: str):
     """
     Execute an approved change request.
     Parses command and makes appropriate changes.
     """
-    command_lower = command.lower().strip()
-    
-    db = get_database()
-    trips = db.trips
+    parsed = parse_change_command(command)
     
     try:
         # Get trip
-        try:
-            trip = await trips.find_one({"_id": ObjectId(trip_id)})
-        except:
-            trip = await trips.find_one({"trip_code": trip_id.upper()})
+        trip = await _get_trip(trip_id)
         
         if not trip:
             return
         
-        # Parse command type
-        if "destination" in command_lower:
-            # Extract destination (everything after "destination to")
-            if "to" in command_lower:
-                new_dest = command.split("to", 1)[1].strip()
-                await trips.update_one(
-                    {"_id": trip["_id"]},
-                    {"$set": {"destination": new_dest, "updated_at": datetime.utcnow()}}
-                )
-                await broadcast_to_chat(trip_id, {
-                    "senderId": "system",
-                    "senderName": "AI Assistant",
-                    "content": f"✅ Destination changed to: {new_dest}",
-                    "type": "ai",
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-        
-        elif "remove" in command_lower:
-            # Remove activity
-            activity_name = command.replace("remove", "").strip()
-            col = get_activities_collection()
-            result = await col.delete_one({"trip_id": trip_id, "name": {"$regex": activity_name, "$options": "i"}})
-            
-            if result.deleted_count > 0:
-                await broadcast_to_chat(trip_id, {
-                    "senderId": "system",
-                    "senderName": "AI Assistant",
-                    "content": f"Removed activity: {activity_name}",
-                    "type": "ai",
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-            else:
-                await broadcast_to_chat(trip_id, {
-                    "senderId": "system",
-                    "senderName": "AI Assistant",
-                    "content": f"Could not find activity: {activity_name}",
-                    "type": "ai",
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-        
-        elif "add" in command_lower or "suggest" in command_lower:
-            # For now, just acknowledge
-            await broadcast_to_chat(trip_id, {
-                "senderId": "system",
-                "senderName": "AI Assistant",
-                "content": f"I'll work on: {command}\n\n(Full implementation coming soon)",
-                "type": "ai",
-                "timestamp": datetime.utcnow().isoformat()
-            })
-        
+        if parsed is None:
+            content = _not_understood_reply(command)
         else:
-            # Generic acknowledgment
-            await broadcast_to_chat(trip_id, {
-                "senderId": "system",
-                "senderName": "AI Assistant",
-                "content": f"✅ Change applied: {command}",
-                "type": "ai",
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            kind, arg = parsed
+            content = await _COMMAND_HANDLERS[kind](trip, trip_id, arg, command)
+        
+        await broadcast_to_chat(trip_id, {
+            "senderId": "system",
+            "senderName": "AI Assistant",
+            "content": content,
+            "type": "ai",
+            "timestamp": datetime.utcnow()
+        })
     
     except Exception as e:
-        print(f"[execute_change_request] Error: {e}")
+        logger.exception("execute_change_request failed for trip %s: %s", trip_id, e)
         await broadcast_to_chat(trip_id, {
             "senderId": "system",
             "senderName": "AI Assistant",
             "content": f"❌ Failed to execute: {command}",
             "type": "ai",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         })
         
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
-# Store active connections: chatId -> [websocket1, websocket2, ...]
-active_connections: Dict[str, List[WebSocket]] = {}
+# Upper bound on a single socket write, so one backpressured client can't stall its relay
+_SEND_TIMEOUT_SECONDS = 5.0
+
+# Outbound frames buffered per client before it is considered too slow and dropped
+_CLIENT_QUEUE_SIZE = 64
+
+
+@dataclass(eq=False)
+class ClientChannel:
+    """
+    One connected client: its socket, a bounded queue of outbound text frames and
+    the relay task draining it. Broadcasters only enqueue, so a slow client never
+    blocks them (orchestrator, heyAI commands, reactions or other members).
+    """
+    chat_id: str
+    ws: WebSocket
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=_CLIENT_QUEUE_SIZE))
+    relay_task: asyncio.Task | None = None
+
+    def start(self):
+        self.relay_task = asyncio.create_task(self._relay())
+
+    async def _relay(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(self.ws.send_text(text), _SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Relay to a client in chat %s stopped: %s", self.chat_id, e)
+            _schedule_reap(self.chat_id, [self])
+
+    def send(self, text: str) -> bool:
+        """Queue a frame; False when the client is backpressured."""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def stop(self):
+        if self.relay_task is not None:
+            self.relay_task.cancel()
+
+    async def close(self):
+        self.stop()
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+
+
+# Store active connections: chatId -> {channel1, channel2, ...}
+active_connections: dict[str, set[ClientChannel]] = {}
+
+# Bounded queue for fire-and-forget broadcasts from request handlers (chatId, payload)
+_BROADCAST_QUEUE_SIZE = 1024
+_broadcast_queue: asyncio.Queue = asyncio.Queue(maxsize=_BROADCAST_QUEUE_SIZE)
+
+# Per-chat locks serializing dead-connection cleanup, and strong refs to reaper tasks
+_reap_locks: dict[str, asyncio.Lock] = {}
+_reaper_tasks: set[asyncio.Task] = set()
+
+
+def enqueue_broadcast(chat_id: str, message_data: dict):
+    """
+    Schedule a broadcast without blocking the caller.
+    When the queue is full the oldest pending broadcast is dropped.
+    The timestamp is filled in by the worker if the payload has none.
+    """
+    try:
+        _broadcast_queue.put_nowait((chat_id, message_data))
+    except asyncio.QueueFull:
+        try:
+            _broadcast_queue.get_nowait()
+            _broadcast_queue.task_done()
+        except asyncio.QueueEmpty:
+            pass
+        _broadcast_queue.put_nowait((chat_id, message_data))
+        logger.warning("Broadcast queue full, dropped oldest pending broadcast")
+
+
+async def run_broadcast_worker():
+    """
+    Drain the broadcast queue one message at a time.
+    Started from the app lifespan; errors are logged instead of lost.
+    """
+    while True:
+        chat_id, message_data = await _broadcast_queue.get()
+        try:
+            message_data.setdefault("timestamp", datetime.utcnow())
+            await broadcast_to_chat(chat_id, message_data)
+        except Exception as e:
+            logger.error("Queued broadcast to chat %s failed: %s", chat_id, e)
+        finally:
+            _broadcast_queue.task_done()
+
+
+# Buffered writes for user chat messages and agent_status progress rows, flushed with
+# insert_many by run_message_flusher(). Messages that are later updated in place
+# (voting, change requests) are written directly by broadcast_to_chat instead.
+_MESSAGE_FLUSH_INTERVAL_SECONDS = 0.1
+_MESSAGE_BATCH_SIZE = 100
+# Cap on buffered messages while the database is unreachable; oldest are dropped past it
+_MESSAGE_BUFFER_MAX = 10_000
+_DUPLICATE_KEY = 11000
+_message_buffer: list = []
+_message_flush_event = asyncio.Event()
+
+
+def _buffer_message(message_doc: dict):
+    """Queue a message document for the next batched insert."""
+    _message_buffer.append(message_doc)
+    if len(_message_buffer) >= _MESSAGE_BATCH_SIZE:
+        _message_flush_event.set()
+
+
+def _requeue_messages(docs: list):
+    """Put docs from a failed flush back in front of the buffer for the next attempt."""
+    global _message_buffer
+    _message_buffer = docs + _message_buffer
+    overflow = len(_message_buffer) - _MESSAGE_BUFFER_MAX
+    if overflow > 0:
+        del _message_buffer[:overflow]
+        logger.error("Message buffer full, dropped %d unsaved message(s)", overflow)
+
+
+async def _flush_messages():
+    """
+    Write all buffered messages. User messages are acknowledged and requeued on
+    failure; agent_status progress rows are ephemeral and written fire-and-forget (w=0).
+    """
+    global _message_buffer
+    if not _message_buffer:
+        return
+    batch, _message_buffer = _message_buffer, []
+
+    messages_collection = get_database().messages
+    status_docs = [d for d in batch if d.get("type") == "agent_status"]
+    other_docs = [d for d in batch if d.get("type") != "agent_status"]
+    if other_docs:
+        try:
+            # insert_many assigns each doc an _id, so a retried doc that did land
+            # comes back as a duplicate key error rather than a second copy
+            await messages_collection.insert_many(other_docs, ordered=False)
+        except BulkWriteError as e:
+            failed = [
+                other_docs[err["index"]]
+                for err in e.details.get("writeErrors", [])
+                if err.get("code") != _DUPLICATE_KEY
+            ]
+            if failed:
+                logger.warning("Failed to save %d buffered message(s), will retry", len(failed))
+                _requeue_messages(failed)
+        except Exception as e:
+            logger.warning("Failed to save %d buffered message(s), will retry: %s", len(other_docs), e)
+            _requeue_messages(other_docs)
+    if status_docs:
+        try:
+            unacked = messages_collection.with_options(write_concern=WriteConcern(w=0))
+            await unacked.insert_many(status_docs, ordered=False)
+        except Exception as e:
+            logger.debug("Dropped %d agent_status row(s): %s", len(status_docs), e)
+    logger.debug("Flushed %d buffered message(s)", len(batch))
+
+
+async def run_message_flusher():
+    """
+    Flush buffered chat messages every _MESSAGE_FLUSH_INTERVAL_SECONDS, or sooner
+    once _MESSAGE_BATCH_SIZE are pending. Started from the app lifespan; drains
+    the buffer one last time when cancelled at shutdown.
+    """
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_message_flush_event.wait(), _MESSAGE_FLUSH_INTERVAL_SECONDS)
+            except TimeoutError:
+                pass
+            _message_flush_event.clear()
+            await _flush_messages()
+    finally:
+        await _flush_messages()
+
+
+def _fanout(chat_id: str, payload: dict) -> int:
+    """
+    Queue payload for every client in a chat without waiting on any socket.
+    The payload is encoded once (orjson when available) and the same text
+    frame is handed to each client's relay.
+    Clients whose queue is full are handed to a background reaper.
+    Returns the number of clients the payload was queued for.
+    """
+    conns = tuple(active_connections.get(chat_id, ()))
+    if not conns:
+        return 0
+
+    text = _dumps(payload)
+    backpressured = [ch for ch in conns if not ch.send(text)]
+    if backpressured:
+        _schedule_reap(chat_id, backpressured)
+    return len(conns) - len(backpressured)
+
+
+def _schedule_reap(chat_id: str, dead: list):
+    task = asyncio.create_task(_reap(chat_id, dead))
+    _reaper_tasks.add(task)
+    task.add_done_callback(_reaper_tasks.discard)
 
 
-async def broadcast_to_chat(chat_id: str, message_data: dict):
+async def _reap(chat_id: str, dead: list):
+    """
+    Remove clients whose relay failed or fell behind and close them, off the broadcast path.
+    """
+    lock = _reap_locks.setdefault(chat_id, asyncio.Lock())
+    async with lock:
+        logger.info("Pruning %d dead connection(s) in chat %s", len(dead), chat_id)
+        remaining = active_connections.get(chat_id)
+        if remaining is not None:
+            remaining.difference_update(dead)
+            if not remaining:
+                active_connections.pop(chat_id, None)
+        for conn in dead:
+            try:
+                await conn.close()
+            except Exception:
+                pass
+    if chat_id not in active_connections and not lock.locked():
+        _reap_locks.pop(chat_id, None)
+
+
+async def broadcast_to_chat(chat_id: str, message_data: dict, persist: bool = True):
   """
   Broadcast a message to all connected clients in a specific chat.
-  Also saves the message to database for persistence.
+  Also saves the message to database for persistence, unless persist is
+  False (the caller has already written it).
   Can be called from other modules (e.g., orchestrator).
   """
   # Save message to database (except for status-only messages)
   msg_type = message_data.get('type', 'unknown')
   
-  try:
-    db = get_database()
-    messages_collection = db.messages
+  if persist:
+    try:
+      db = get_database()
+      messages_collection = db.messages
     
-    # Handle vote_update - update existing voting message
-    if msg_type == 'vote_update':
-      phase = message_data.get("phase")
-      if phase:
-        await messages_collection.update_one(
-          {"chatId": chat_id, "type": "voting", "phase": phase},
-          {"$set": {"options": message_data.get("options", [])}}
-        )
-        print(f"[broadcast] Updated voting options for phase {phase} in database")
+      # Handle vote_update - update existing voting message
+      if msg_type == 'vote_update':
+        phase = message_data.get("phase")
+        if phase:
+          await messages_collection.update_one(
+            {"chatId": chat_id, "type": "voting", "phase": phase},
+            {"$set": {"options": message_data.get("options", [])}}
+          )
+          logger.debug("Updated voting options for phase %s in database", phase)
     
-    # Save new messages to database for persistence
-    elif msg_type in ['ai', 'voting', 'change_request', 'system', 'agent_status']:
-      # Prepare message document
-      message_doc = {
-        "chatId": chat_id,
-        "senderId": message_data.get("senderId", "system"),
-        "senderName": message_data.get("senderName", "AI Assistant"),
-        "content": message_data.get("content", ""),
-        "type": msg_type,
-        "createdAt": datetime.utcnow()
-      }
+      # Save new messages to database for persistence
+      elif msg_type in ['ai', 'voting', 'change_request', 'system', 'agent_status']:
+        # Prepare message document
+        message_doc = {
+          "chatId": chat_id,
+          "senderId": message_data.get("senderId", "system"),
+          "senderName": message_data.get("senderName", "AI Assistant"),
+          "content": message_data.get("content", ""),
+          "type": msg_type,
+          "createdAt": datetime.utcnow()
+        }
       
-      # Add type-specific fields
-      if msg_type == "voting":
-        message_doc["phase"] = message_data.get("phase")
-        message_doc["options"] = message_data.get("options", [])
-      elif msg_type == "change_request":
-        message_doc["message_id"] = message_data.get("message_id")
-        message_doc["change_data"] = message_data.get("change_data", {})
-      elif msg_type == "agent_status":
-        message_doc["agent_name"] = message_data.get("agent_name")
-        message_doc["status"] = message_data.get("status")
-        message_doc["step"] = message_data.get("step")
-        message_doc["progress"] = message_data.get("progress")
-        message_doc["elapsed_seconds"] = message_data.get("elapsed_seconds")
+        # Add type-specific fields
+        if msg_type == "voting":
+          message_doc["phase"] = message_data.get("phase")
+          message_doc["options"] = message_data.get("options", [])
+        elif msg_type == "change_request":
+          message_doc["message_id"] = message_data.get("message_id")
+          message_doc["change_data"] = message_data.get("change_data", {})
+        elif msg_type == "agent_status":
+          message_doc["agent_name"] = message_data.get("agent_name")
+          message_doc["status"] = message_data.get("status")
+          message_doc["step"] = message_data.get("step")
+          message_doc["progress"] = message_data.get("progress")
+          message_doc["elapsed_seconds"] = message_data.get("elapsed_seconds")
       
-      await messages_collection.insert_one(message_doc)
-      print(f"[broadcast] Saved {msg_type} message to database for chat {chat_id}")
-  except Exception as e:
-    print(f"[broadcast] Warning: Failed to save/update message in database: {e}")
+        if msg_type == "agent_status":
+          _buffer_message(message_doc)
+          logger.debug("Buffered %s message for chat %s", msg_type, chat_id)
+        else:
+          # Written before the fan-out so history reads and later in-place
+          # updates (vote_update, reactions) always find the message
+          await messages_collection.insert_one(message_doc)
+          logger.debug("Saved %s message for chat %s", msg_type, chat_id)
+    except Exception as e:
+      logger.warning("Failed to save/update message in database: %s", e)
   
   # Broadcast to connected clients
-  if chat_id in active_connections:
-    print(f"[broadcast] Broadcasting {msg_type} to {len(active_connections[chat_id])} clients in chat {chat_id}")
-    for connection in active_connections[chat_id]:
-      try:
-        await connection.send_json(message_data)
-      except Exception as e:
-        print(f"[broadcast] Failed to send to connection: {e}")
-  else:
-    print(f"[broadcast] No active connections for chat {chat_id}, message saved to DB but not broadcast")
+  sent = _fanout(chat_id, message_data)
+  logger.debug("Broadcast %s to %d client(s) in chat %s", msg_type, sent, chat_id)
+
+
+def _only_for(msg_type: str, field: str) -> dict:
+    """Projection expression emitting field only on messages of msg_type."""
+    return {"$cond": [{"$eq": ["$type", msg_type]}, f"${field}", "$$REMOVE"]}
+
+
+# Frontend message shape; timestamp matches datetime.isoformat() (naive UTC, no Z)
+_MESSAGE_PROJECTION = {
+    "$project": {
+        "_id": 0,
+        "senderId": 1,
+        "senderName": 1,
+        "content": {"$ifNull": ["$content", ""]},
+        "type": {"$ifNull": ["$type", "user"]},
+        "timestamp": {
+            "$dateToString": {
+                "date": {"$ifNull": ["$createdAt", "$$NOW"]},
+                "format": "%Y-%m-%dT%H:%M:%S.%L",
+            }
+        },
+        "phase": _only_for("voting", "phase"),
+        "options": {
+            "$cond": [{"$eq": ["$type", "voting"]}, {"$ifNull": ["$options", []]}, "$$REMOVE"]
+        },
+        "agent_name": _only_for("agent_status", "agent_name"),
+        "status": _only_for("agent_status", "status"),
+        "step": _only_for("agent_status", "step"),
+        "progress": _only_for("agent_status", "progress"),
+        "elapsed_seconds": _only_for("agent_status", "elapsed_seconds"),
+    }
+}
 
 
 @router.get("/messages/{chat_id}", response_model=APIResponse)
@@ -229,41 +575,27 @@ async def get_chat_messages(
 ):
   """
   Fetch historical chat messages for a specific trip/chat.
-  Returns messages sorted by creation time (oldest first).
+  Returns the latest `limit` messages sorted by creation time (oldest first).
   """
   try:
+    # Land buffered messages first so history matches what the live socket showed
+    await _flush_messages()
+
     db = get_database()
     messages_collection = db.messages
     
-    # Query messages for this chat
-    cursor = messages_collection.find({"chatId": chat_id}).sort("createdAt", 1).limit(limit)
-    messages = await cursor.to_list(length=limit)
-    
-    # Format messages for frontend
-    formatted_messages = []
-    for msg in messages:
-      formatted_msg = {
-        "senderId": msg.get("senderId"),
-        "senderName": msg.get("senderName"),
-        "content": msg.get("content", ""),
-        "type": msg.get("type", "user"),
-        "timestamp": msg.get("createdAt").isoformat() if msg.get("createdAt") else datetime.utcnow().isoformat()
-      }
-      
-      # Include additional fields for specific message types
-      if msg.get("type") == "voting":
-        formatted_msg["phase"] = msg.get("phase")
-        formatted_msg["options"] = msg.get("options", [])
-      elif msg.get("type") == "agent_status":
-        formatted_msg["agent_name"] = msg.get("agent_name")
-        formatted_msg["status"] = msg.get("status")
-        formatted_msg["step"] = msg.get("step")
-        formatted_msg["progress"] = msg.get("progress")
-        formatted_msg["elapsed_seconds"] = msg.get("elapsed_seconds")
-      
-      formatted_messages.append(formatted_msg)
+    # Latest messages for this chat (index-backed sliding window), shaped for the
+    # frontend server-side and returned in chronological order
+    pipeline = [
+      {"$match": {"chatId": chat_id}},
+      {"$sort": {"createdAt": -1}},
+      {"$limit": limit},
+      {"$sort": {"createdAt": 1}},
+      _MESSAGE_PROJECTION,
+    ]
+    formatted_messages = await messages_collection.aggregate(pipeline).to_list(length=limit)
     
-    print(f"[get_chat_messages] Returning {len(formatted_messages)} messages for chat {chat_id}")
+    logger.debug("get_chat_messages returning %d messages for chat %s", len(formatted_messages), chat_id)
     
     return APIResponse(
       code=0,
@@ -272,48 +604,53 @@ async def get_chat_messages(
     )
     
   except Exception as e:
-    print(f"[get_chat_messages] Error: {e}")
-    import traceback
-    traceback.print_exc()
+    logger.exception("get_chat_messages failed for chat %s: %s", chat_id, e)
     raise HTTPException(status_code=500, detail=f"Failed to fetch messages: {str(e)}")
 
 
+# Prefix of the keepalive frame sent by passive listeners ({type: 'ping', ...})
+_PING_PREFIX = '{"type":"ping"'
+
+
 @router.websocket("/{chat_id}")
 async def chat_websocket(websocket: WebSocket, chat_id: str):
   await websocket.accept()
-  print(f"[chat_ws] New connection for chat_id={chat_id}")
+  logger.info("New connection for chat_id=%s", chat_id)
 
-  # Add to active connections
-  if chat_id not in active_connections:
-    active_connections[chat_id] = []
-  active_connections[chat_id].append(websocket)
-  print(f"[chat_ws] Active connections for {chat_id}: {len(active_connections[chat_id])}")
+  # Add to active connections, with its own outbound relay
+  channel = ClientChannel(chat_id, websocket)
+  channel.start()
+  active_connections.setdefault(chat_id, set()).add(channel)
+  logger.debug("Active connections for %s: %d", chat_id, len(active_connections[chat_id]))
 
   try:
     while True:
       # Receive message from client
-      data = await websocket.receive_json()
-      print(f"[chat_ws] Received data: {data}")
+      text = await websocket.receive_text()
 
-      # Get MongoDB collections
-      db = get_database()
-      messages_collection = db.messages
+      # Fast path: keepalive pings (JSON.stringify puts "type" first) skip decoding
+      if text.startswith(_PING_PREFIX):
+        continue
+
+      data = _loads(text)
 
       # Check message type
       message_type = data.get("type", "user")
       message_content = data.get("content", "").strip()
+      sender_id = data.get("senderId")
+      sender_name = data.get("senderName")
       
       # Ignore ping messages (used for passive listeners like TripDetail page)
       if message_type == "ping":
-        print(f"[chat_ws] Ping received from {data.get('senderId')} in chat {chat_id}")
+        logger.debug("Ping received from %s in chat %s", sender_id, chat_id)
         continue
       
-      # Check if this is a heyAI command
-      if message_content.lower().startswith("heyai"):
+      # Check if this is a heyAI command (lowercase only the prefix, not the whole message)
+      if message_content[:5].lower() == "heyai":
         # This is a command for the AI
         await handle_heyai_command(
           message_content,
-          data.get("senderId"),
+          sender_id,
           chat_id
         )
         # Don't save as regular message, continue to next iteration
@@ -322,35 +659,124 @@ async def chat_websocket(websocket: WebSocket, chat_id: str):
       # Save regular user message to MongoDB
       message_doc = {
         "chatId": chat_id,
-        "senderId": data.get("senderId"),
-        "senderName": data.get("senderName"),
+        "senderId": sender_id,
+        "senderName": sender_name,
         "content": message_content,
         "type": "user",
         "createdAt": datetime.utcnow()
       }
-      await messages_collection.insert_one(message_doc)
-      print(f"[chat_ws] Message saved: {data.get('senderName')} in chat {chat_id}")
+      _buffer_message(message_doc)
+      logger.debug("Message buffered: %s in chat %s", sender_name, chat_id)
 
       # Broadcast user message to all clients in this chat
-      for connection in active_connections[chat_id]:
-        await connection.send_json(data)
+      _fanout(chat_id, data)
 
   except WebSocketDisconnect:
-    print(f"[chat_ws] Client disconnected from chat {chat_id}")
-    # Remove from active connections
-    active_connections[chat_id].remove(websocket)
-    if not active_connections[chat_id]:
-      del active_connections[chat_id]
-      print(f"[chat_ws] No more connections for chat {chat_id}, cleaning up")
+    logger.info("Client disconnected from chat %s", chat_id)
+    # Remove from active connections (may already be pruned by the reaper)
+    channel.stop()
+    conns = active_connections.get(chat_id)
+    if conns is not None:
+      conns.discard(channel)
+      if not conns:
+        active_connections.pop(chat_id, None)
+        logger.debug("No more connections for chat %s, cleaning up", chat_id)
   except Exception as e:
-    print(f"[chat_ws] Error in WebSocket for chat {chat_id}: {e}")
-    import traceback
-    traceback.print_exc()
+    logger.exception("Error in WebSocket for chat %s: %s", chat_id, e)
     # Remove from active connections
-    if chat_id in active_connections and websocket in active_connections[chat_id]:
-      active_connections[chat_id].remove(websocket)
-      if not active_connections[chat_id]:
-        del active_connections[chat_id]
+    channel.stop()
+    conns = active_connections.get(chat_id)
+    if conns is not None:
+      conns.discard(channel)
+      if not conns:
+        active_connections.pop(chat_id, None)
+
+# Debounced reaction broadcasts: message_id -> (pending timer, chat_id)
+_REACTION_DEBOUNCE_SECONDS = 0.1
+_pending_reactions: dict[str, tuple] = {}
+# Strong references to in-flight flushes so they are not garbage-collected mid-run
+_reaction_tasks: set[asyncio.Task] = set()
+
+
+def _schedule_reaction_broadcast(message_id: str, chat_id: str):
+    """
+    Coalesce bursts of reactions on one message into a single broadcast.
+    Each call pushes the flush back by the debounce window.
+    """
+    pending = _pending_reactions.get(message_id)
+    if pending:
+        pending[0].cancel()
+    loop = asyncio.get_running_loop()
+    handle = loop.call_later(
+        _REACTION_DEBOUNCE_SECONDS,
+        _start_reaction_flush,
+        message_id,
+    )
+    _pending_reactions[message_id] = (handle, chat_id)
+
+
+def _start_reaction_flush(message_id: str):
+    task = asyncio.create_task(_flush_reaction_broadcast(message_id))
+    _reaction_tasks.add(task)
+    task.add_done_callback(_reaction_tasks.discard)
+
+
+async def _flush_reaction_broadcast(message_id: str):
+    """Read the settled reaction state once and broadcast it."""
+    pending = _pending_reactions.pop(message_id, None)
+    if not pending:
+        return
+    chat_id = pending[1]
+    try:
+        message = await get_database().messages.find_one(
+            {"_id": ObjectId(message_id)}, {"change_data": 1}
+        )
+        if not message:
+            return
+        change_data = message.get("change_data", {})
+        approvals = change_data.get("approvals_current", 0)
+        approvals_needed = change_data.get("approvals_needed", 0)
+        await broadcast_to_chat(chat_id, {
+            "type": "reaction_update",
+            "message_id": message_id,
+            "reactions": change_data.get("reactions", {}),
+            "approvals_current": approvals,
+            "approvals_needed": approvals_needed,
+            "approved": approvals_needed > 0 and approvals >= approvals_needed,
+            "timestamp": datetime.utcnow()
+        })
+    except Exception as e:
+        logger.error("Reaction broadcast for message %s failed: %s", message_id, e)
+
+
+def _reaction_toggle_pipeline(user_id: str, emoji: str) -> list:
+    """
+    Update pipeline toggling user_id's reaction (remove if present, else set emoji)
+    and recomputing change_data.approvals_current from the resulting reactions.
+    """
+    reaction_path = f"change_data.reactions.{user_id}"
+    return [
+        {"$set": {
+            reaction_path: {
+                "$cond": [
+                    {"$eq": [{"$type": f"${reaction_path}"}, "missing"]},
+                    {"$literal": emoji},
+                    "$$REMOVE",
+                ]
+            }
+        }},
+        {"$set": {
+            "change_data.approvals_current": {
+                "$size": {
+                    "$filter": {
+                        "input": {"$objectToArray": {"$ifNull": ["$change_data.reactions", {}]}},
+                        "cond": {"$eq": ["$$this.v", "👍"]},
+                    }
+                }
+            }
+        }},
+    ]
+
 
 @router.post("/messages/{message_id}/react")
 async def add_reaction(
@@ -363,61 +789,64 @@ async def add_reaction(
     Used for voting on heyAI change requests.
     """
     try:
-        from bson import ObjectId
-        
         db = get_database()
         messages_collection = db.messages
-        trips_collection = db.trips
         
         # Find the message
-        try:
-            message = await messages_collection.find_one({"_id": ObjectId(message_id)})
-        except:
+        if not ObjectId.is_valid(message_id):
             raise HTTPException(status_code=400, detail="Invalid message ID")
         
-        if not message:
-            raise HTTPException(status_code=404, detail="Message not found")
+        # Toggle the reaction and recount approvals in one atomic pipeline update
+        # (if already reacted, remove it)
+        message = await messages_collection.find_one_and_update(
+            {"_id": ObjectId(message_id), "type": "change_request"},
+            _reaction_toggle_pipeline(user_id, emoji),
+            projection={"chatId": 1, "change_data": 1},
+            return_document=ReturnDocument.AFTER,
+        )
         
-        if message.get("type") != "change_request":
+        if not message:
+            exists = await messages_collection.find_one({"_id": ObjectId(message_id)}, {"_id": 1})
+            if not exists:
+                raise HTTPException(status_code=404, detail="Message not found")
             raise HTTPException(status_code=400, detail="Can only react to change requests")
         
-        # Get change data
-        change_data = message.get("change_data", {})
-        reactions = change_data.get("reactions", {})
-        
-        # Toggle reaction (if already reacted, remove it)
-        if user_id in reactions:
-            del reactions[user_id]
-        else:
-            reactions[user_id] = emoji
-        
-        # Count approvals (👍)
-        approvals = sum(1 for e in reactions.values() if e == "👍")
-        
-        # Get trip to calculate majority threshold
         trip_id = message.get("chatId")
-        try:
-            trip = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-        except:
-            trip = await trips_collection.find_one({"trip_code": trip_id.upper()})
-        
-        if not trip:
-            raise HTTPException(status_code=404, detail="Trip not found")
-        
-        total_members = len(trip.get("members", []))
-        approvals_needed = (total_members // 2) + 1  # Simple majority
+        change_data = message.get("change_data", {})
+        approvals = change_data.get("approvals_current", 0)
         
-        # Update change data
-        change_data["reactions"] = reactions
-        change_data["approvals_current"] = approvals
-        change_data["approvals_needed"] = approvals_needed
+        # Majority threshold is stored at creation; older requests fall back to the trip
+        approvals_needed = change_data.get("approvals_needed") or 0
+        counters = {}
+        if not approvals_needed:
+            trip = await _get_trip(trip_id)
+            
+            if not trip:
+                raise HTTPException(status_code=404, detail="Trip not found")
+            
+            total_members = len(trip.get("members", []))
+            approvals_needed = (total_members // 2) + 1  # Simple majority
+            counters["change_data.approvals_needed"] = approvals_needed
         
         # Check if threshold met
         approved = approvals >= approvals_needed
         
+        # Crossing the threshold flips pending -> approved exactly once, even under
+        # concurrent reactions; below it there is nothing left to write
+        flipped = False
         if approved and change_data.get("status") == "pending":
-            change_data["status"] = "approved"
+            transition = await messages_collection.update_one(
+                {"_id": message["_id"], "change_data.status": "pending"},
+                {"$set": {**counters, "change_data.status": "approved"}}
+            )
+            flipped = transition.modified_count > 0
         
+        if counters and not flipped:
+            await messages_collection.update_one(
+                {"_id": message["_id"]},
+                {"$set": counters}
+            )
+        if flipped:
             # Execute the approved change
             await execute_change_request(
                 trip_id,
@@ -425,22 +854,8 @@ async def add_reaction(
                 change_data["requested_by"]
             )
         
-        # Update message in database
-        await messages_collection.update_one(
-            {"_id": ObjectId(message_id)},
-            {"$set": {"change_data": change_data}}
-        )
-        
-        # Broadcast reaction update to all clients
-        await broadcast_to_chat(trip_id, {
-            "type": "reaction_update",
-            "message_id": message_id,
-            "reactions": reactions,
-            "approvals_current": approvals,
-            "approvals_needed": approvals_needed,
-            "approved": approved,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        # Broadcast reaction update to all clients (debounced per message)
+        _schedule_reaction_broadcast(message_id, trip_id)
         
         return {
             "success": True,
@@ -452,5 +867,5 @@ async def add_reaction(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[add_reaction] Error: {e}")
+        logger.exception("add_reaction failed for message %s: %s", message_id, e)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,18 +1,63 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any
+
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from pydantic import BaseModel
 
 from app.core.config import OPEN_AI_API_KEY, OPEN_AI_MODEL, JWT_ALGORITHM, JWT_SECRET
+from app.core.llm_cache import ExactResponseCache, SemanticResponseCache, prompt_hash
 from app.models.common import APIResponse
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 security = HTTPBearer()
+logger = logging.getLogger(__name__)
+
+# Exact and semantic caches of assistant replies (in-memory, per process)
+_exact_cache = ExactResponseCache()
+_response_cache = SemanticResponseCache()
+
+# Shared chat model, created on first use (keeps its HTTP client across requests)
+_llm = None
+
+
+def _get_llm():
+    """Return the process-wide ChatOpenAI client, creating it on first call."""
+    global _llm
+    if _llm is None:
+        from langchain_openai import ChatOpenAI
+
+        _llm = ChatOpenAI(model=OPEN_AI_MODEL, temperature=0.7, api_key=OPEN_AI_API_KEY)
+    return _llm
+
+
+_SYSTEM_PROMPT = """You are a helpful AI travel planning assistant for a group travel planning application. 
+Your role is to help users plan their trips by:
+- Answering questions about travel destinations, activities, and planning
+- Providing suggestions for group travel
+- Helping with itinerary planning
+- Answering questions about preferences, budgets, and travel logistics
+- Being friendly, informative, and concise
+
+Keep your responses conversational and helpful. If you don't know something, admit it rather than making things up."""
+
+
+@lru_cache(maxsize=1)
+def _system_message():
+    """Build the constant system message once and reuse it across requests."""
+    from langchain_core.messages import SystemMessage
+
+    return SystemMessage(content=_SYSTEM_PROMPT)
 
 
 class ChatRequest(BaseModel):
     message: str
-    history: list[dict[str, str]] = []
+    # Entries are {"role", "content"} dicts; kept as Any so pydantic does not
+    # walk every history item on each request (only the last 10 are used).
+    history: list[Any] = []
 
 
 def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
@@ -42,33 +87,20 @@ async def chat(request: ChatRequest, user_id: str = Depends(get_current_user_id)
         )
 
     try:
-        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-        from langchain_openai import ChatOpenAI
-
-        llm = ChatOpenAI(
-            model=OPEN_AI_MODEL, temperature=0.7, api_key=OPEN_AI_API_KEY
-        )
-
-        # Build conversation context
-        system_prompt = """You are a helpful AI travel planning assistant for a group travel planning application. 
-Your role is to help users plan their trips by:
-- Answering questions about travel destinations, activities, and planning
-- Providing suggestions for group travel
-- Helping with itinerary planning
-- Answering questions about preferences, budgets, and travel logistics
-- Being friendly, informative, and concise
-
-Keep your responses conversational and helpful. If you don't know something, admit it rather than making things up."""
+        from langchain_core.messages import AIMessage, HumanMessage
 
         # Format conversation history using LangChain message types
-        messages = [SystemMessage(content=system_prompt)]
+        messages = [_system_message()]
 
         # Add history (limit to last 10 messages to avoid token limits)
-        recent_history = request.history[-10:] if len(request.history) > 10 else request.history
-        for msg in recent_history:
+        turns: list[tuple[str, str]] = []
+        for msg in request.history[-10:]:
+            if not isinstance(msg, dict):
+                continue
             role = msg.get("role", "user")
             content = msg.get("content", "")
             if content:
+                turns.append((role, content))
                 if role == "user":
                     messages.append(HumanMessage(content=content))
                 elif role == "assistant":
@@ -77,9 +109,30 @@ Keep your responses conversational and helpful. If you don't know something, adm
         # Add current message
         messages.append(HumanMessage(content=request.message))
 
+        # Semantic matches are only considered within the same model and (truncated) history
+        history_scope = prompt_hash(OPEN_AI_MODEL, turns)
+
+        # Serve byte-identical conversations from the exact cache (no embedding cost)
+        turns.append(("user", request.message))
+        exact_key = prompt_hash(OPEN_AI_MODEL, turns)
+        cached_text = _exact_cache.get(exact_key)
+        if cached_text is not None:
+            logger.debug("Response cache HIT (exact)")
+            return APIResponse(code=0, msg="ok", data={"message": cached_text})
+
+        # Serve near-duplicate questions asked after the same conversation from cache
+        cache_key = await asyncio.to_thread(_response_cache.embed, request.message)
+        cached_text = _response_cache.lookup(cache_key, history_scope)
+        if cached_text is not None:
+            logger.debug("Response cache HIT (semantic)")
+            return APIResponse(code=0, msg="ok", data={"message": cached_text})
+        logger.debug("Response cache MISS")
+
         # Get response from LLM
-        response = llm.invoke(messages)
+        response = await _get_llm().ainvoke(messages)
         response_text = response.content if hasattr(response, "content") else str(response)
+        _exact_cache.set(exact_key, response_text)
+        _response_cache.update(cache_key, history_scope, response_text)
 
         return APIResponse(
             code=0,
@@ -3,6 +3,9 @@ Location Router
 Provides location autocomplete using Google Places API
 """
 
+import time
+from collections import OrderedDict
+
 from fastapi import APIRouter, HTTPException, Query
 import httpx
 from app.core.config import GOOGLE_MAPS_API_KEY
@@ -10,6 +13,51 @@ from app.models.common import APIResponse
 
 router = APIRouter(prefix="/locations", tags=["Locations"])
 
+_AUTOCOMPLETE_URL = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
+
+# Shared client so keystrokes reuse the same keep-alive connection to Google
+_http_client: httpx.AsyncClient | None = None
+
+# Predictions per normalized query: query -> (expires_at, predictions)
+_CACHE_TTL_SECONDS = 300
+_CACHE_MAXSIZE = 2048
+_autocomplete_cache: OrderedDict[str, tuple[float, list]] = OrderedDict()
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=5.0, limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared Google Places client (called on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _cache_get(key: str) -> list | None:
+    entry = _autocomplete_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _autocomplete_cache[key]
+        return None
+    _autocomplete_cache.move_to_end(key)
+    return entry[1]
+
+
+def _cache_set(key: str, predictions: list) -> None:
+    _autocomplete_cache[key] = (time.monotonic() + _CACHE_TTL_SECONDS, predictions)
+    _autocomplete_cache.move_to_end(key)
+    while len(_autocomplete_cache) > _CACHE_MAXSIZE:
+        _autocomplete_cache.popitem(last=False)
+
 
 @router.get("/autocomplete", response_model=APIResponse)
 async def autocomplete_location(
@@ -30,36 +78,43 @@ async def autocomplete_location(
             detail="Google Maps API key not configured. Please set GOOGLE_MAPS_API_KEY environment variable.",
         )
 
+    # Users retype the same prefixes ("Tok", "Toky", "Tokyo"); serve repeats from cache
+    cache_key = input.strip().lower()
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return APIResponse(code=0, msg="ok", data={"predictions": cached})
+
     try:
-        url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
         params = {
             "input": input,
             "types": "(regions)",  # Focus on cities, regions, countries
             "key": GOOGLE_MAPS_API_KEY,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
+        response = await _get_http_client().get(_AUTOCOMPLETE_URL, params=params)
 
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Google Places API error: {response.text}",
-                )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Google Places API error: {response.text}",
+            )
 
-            data = response.json()
+        data = response.json()
 
-            if data.get("status") != "OK":
-                # Handle specific Google API errors
-                if data.get("status") == "ZERO_RESULTS":
-                    return APIResponse(code=0, msg="ok", data={"predictions": []})
-                else:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Google Places API returned status: {data.get('status')}",
-                    )
+        if data.get("status") != "OK":
+            # Handle specific Google API errors
+            if data.get("status") == "ZERO_RESULTS":
+                _cache_set(cache_key, [])
+                return APIResponse(code=0, msg="ok", data={"predictions": []})
+            else:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Google Places API returned status: {data.get('status')}",
+                )
 
-            return APIResponse(code=0, msg="ok", data={"predictions": data.get("predictions", [])})
+        predictions = data.get("predictions", [])
+        _cache_set(cache_key, predictions)
+        return APIResponse(code=0, msg="ok", data={"predictions": predictions})
 
     except httpx.HTTPError as e:
         raise HTTPException(
@@ -1,20 +1,29 @@
-from datetime import datetime
+import logging
+import time
+from datetime import UTC, datetime
+from functools import lru_cache
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
 
-from app.agents.preference_agent import PreferenceAgent
+from app.agents.preference_agent import PreferenceAgent, normalize_deal_breakers, vec_key
 from app.db.database import get_database, get_preferences_collection
 from app.models.common import APIResponse
-from app.models.preference import Preference as PreferenceDoc
 
 router = APIRouter(prefix="/preferences", tags=["Preferences"])
+logger = logging.getLogger(__name__)
 
 # Keep a single in-memory agent instance (simple, non-persistent)
 _agent = PreferenceAgent()
 _TRIP_ID = "default"
 
+# Short-lived aggregate payloads per trip (planner UIs poll /aggregate); dropped on write
+_AGG_CACHE_TTL_SECONDS = 2.0
+_agg_cache: dict[str, tuple[float, dict]] = {}
+
 # Allowed top-level vibe cards and mapping to agent tags (6 canonical vibes)
 _VIBE_MAP: dict[str, str] = {
     "adventure": "adventure",
@@ -43,97 +52,122 @@ class CreatePreferenceRequest(BaseModel):
         default_factory=list, description="Available date ranges in format 'YYYY-MM-DD:YYYY-MM-DD'"
     )
 
+    class Config:
+        # Read-only once parsed; instances are never copied or revalidated
+        frozen = True
 
-def _scorecard_from_vibes(vibes: list[str]) -> dict[str, float]:
-    # Limit to the 6 cards and map to agent tags
-    normalized = []
-    for v in vibes:
-        key = (v or "").strip().lower()
-        if key in _VIBE_MAP:
-            normalized.append(_VIBE_MAP[key])
 
-    # Weight by order: 0.9, 0.8, 0.7, then floor at 0.5
-    def w(i: int) -> float:
-        return max(0.5, round(0.9 - 0.1 * i, 1))
+def _ok(data: dict, status_code: int = 200) -> ORJSONResponse:
+    """
+    Success envelope (same shape as APIResponse) encoded straight to orjson.
+    Returning a Response skips FastAPI's jsonable_encoder + response_model pass;
+    response_model stays on the routes for the OpenAPI schema only.
+    """
+    return ORJSONResponse({"code": 0, "msg": "ok", "data": data}, status_code=status_code)
+
 
+# Weight by order: 0.9, 0.8, 0.7, then floor at 0.5 (one weight per scored card)
+_VIBE_WEIGHTS = (0.9, 0.8, 0.7, 0.6, 0.5, 0.5)
+
+
+@lru_cache(maxsize=512)
+def _scorecard_cached(vibes: tuple[str, ...]) -> tuple[tuple[str, float], ...]:
+    # Limit to the 6 cards and map to agent tags; only recognized vibes consume a weight
     out: dict[str, float] = {}
-    for idx, tag in enumerate(normalized[:6]):
-        out[tag] = w(idx)
-    return out
+    idx = 0
+    for v in vibes:
+        tag = _VIBE_MAP.get((v or "").strip().lower())
+        if tag is None:
+            continue
+        out[tag] = _VIBE_WEIGHTS[idx]
+        idx += 1
+        if idx == len(_VIBE_WEIGHTS):
+            break
+    return tuple(out.items())
 
 
-@router.post("/", status_code=201, response_model=APIResponse)
-async def create_preference(body: CreatePreferenceRequest):
+def _scorecard_from_vibes(vibes: list[str]) -> dict[str, float]:
+    # Few distinct card orderings exist in practice, so memoize on the raw sequence
+    return dict(_scorecard_cached(tuple(vibes)))
+
+
+@router.post(
+    "/",
+    status_code=201,
+    response_model=APIResponse,
+    # Body is parsed manually below; keep it documented in the OpenAPI schema
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {"schema": CreatePreferenceRequest.model_json_schema()}
+            },
+            "required": True,
+        }
+    },
+)
+async def create_preference(request: Request):
     """
     Add or update a user's preference in the database .
     """
+    # Single-pass parse + validate (pydantic-core) instead of json.loads then model_validate
+    try:
+        body = CreatePreferenceRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        # Match FastAPI's own body validation errors, which are located under "body"
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors()]
+        )
     tid = body.trip_id
     uid = body.user_id
-    print(f"[preference] Received preference for trip={tid}, user={uid}, vibes={body.vibes}")
+    logger.debug("preference received for trip=%s user=%s vibes=%s", tid, uid, body.vibes)
 
     col = get_preferences_collection()
 
-    # Check if preference already exists
-    existing_preference = await col.find_one({"trip_id": tid, "user_id": uid})
-
-    current_time = datetime.utcnow()
-    is_update = existing_preference is not None
-
-    if existing_preference:
-        # Update existing preference using Preference model
-        preference_doc = PreferenceDoc(
-            trip_id=tid,
-            user_id=uid,
-            destination=body.destination,
-            budget_level=body.budget_level,
-            vibes=body.vibes or [],
-            deal_breaker=body.deal_breaker,
-            notes=body.notes,
-            available_dates=body.available_dates or [],
-            created_at=existing_preference.get("created_at", current_time),
-            updated_at=current_time,
-        )
-
-        await col.update_one(
-            {"trip_id": tid, "user_id": uid},
-            {"$set": preference_doc.model_dump(exclude={"created_at"})},
-        )
-    else:
-        # Create new preference using Preference model
-        preference_doc = PreferenceDoc(
-            trip_id=tid,
-            user_id=uid,
-            destination=body.destination,
-            budget_level=body.budget_level,
-            vibes=body.vibes or [],
-            deal_breaker=body.deal_breaker,
-            notes=body.notes,
-            available_dates=body.available_dates or [],
-            created_at=current_time,
-            updated_at=current_time,
-        )
-
-        await col.insert_one(preference_doc.model_dump())
+    current_time = datetime.now(UTC)
+    # Request body is already validated, so write the document fields directly
+    # (same shape as app.models.preference.Preference) without a model round-trip
+    preference_doc = {
+        "trip_id": tid,
+        "user_id": uid,
+        "destination": body.destination,
+        "budget_level": body.budget_level,
+        "vibes": body.vibes or [],
+        "deal_breaker": body.deal_breaker,
+        "notes": body.notes,
+        "available_dates": body.available_dates or [],
+        "updated_at": current_time,
+    }
+
+    # Omitted optional fields are removed rather than stored as nulls (readers use .get)
+    update: dict = {
+        "$set": {k: v for k, v in preference_doc.items() if v is not None},
+        "$setOnInsert": {"created_at": current_time},
+    }
+    unset_fields = {k: "" for k, v in preference_doc.items() if v is None}
+    if unset_fields:
+        update["$unset"] = unset_fields
+
+    # Create or update in one round-trip; created_at is only written on insert
+    result = await col.update_one({"trip_id": tid, "user_id": uid}, update, upsert=True)
+    is_update = result.matched_count > 0
+    _agg_cache.pop(tid, None)
 
     # Track that this user has submitted preferences for this trip (both create and update)
     try:
         db = get_database()
         trips_collection = db.trips
 
-        # Try ObjectId first, then fallback to string ID
-        try:
-            result = await trips_collection.update_one(
-                {"_id": ObjectId(tid)},
-                {"$addToSet": {"members_with_preferences": uid}},
-            )
-        except Exception:
-            result = await trips_collection.update_one(
-                {"trip_id": tid},
-                {"$addToSet": {"members_with_preferences": uid}},
-            )
-
-        print(
-            f"[add_preference] Updated trip member status: matched={result.matched_count}, modified={result.modified_count}"
+        # ObjectId when valid, otherwise fall back to string ID
+        trip_filter = {"_id": ObjectId(tid)} if ObjectId.is_valid(tid) else {"trip_id": tid}
+        result = await trips_collection.update_one(
+            trip_filter,
+            {"$addToSet": {"members_with_preferences": uid}},
+        )
+
+        logger.debug(
+            "add_preference trip member status: matched=%d modified=%d",
+            result.matched_count,
+            result.modified_count,
         )
 
         # Broadcast preference submission to all connected clients
@@ -145,15 +179,15 @@ async def create_preference(body: CreatePreferenceRequest):
                     "trip_id": tid,
                     "user_id": uid,
                 })
-                print(f"[add_preference] Broadcasted preference_submitted for user {uid}")
+                logger.debug("add_preference broadcast preference_submitted for user %s", uid)
             except Exception as e:
-                print(f"[add_preference] Failed to broadcast preference update: {e}")
+                logger.warning("add_preference failed to broadcast preference update: %s", e)
     except Exception as e:
-        print(f"[add_preference] Warning: could not update trip member status: {e}")
+        logger.warning("add_preference could not update trip member status: %s", e)
 
     message = f"Preference {'updated' if is_update else 'created'} successfully"
-    return APIResponse(
-        code=0, msg="ok", data={"success": True, "user_id": uid, "trip_id": tid, "message": message}
+    return _ok(
+        {"success": True, "user_id": uid, "trip_id": tid, "message": message}, status_code=201
     )
 
 
@@ -165,8 +199,12 @@ async def get_trip_aggregate(trip_id: str | None = Query(None, description="Trip
     """
     tid = trip_id or _TRIP_ID
 
-    # Get aggregation from agent
-    agg = _agent.aggregate(tid)
+    cached = _agg_cache.get(tid)
+    if cached is not None and cached[0] > time.monotonic():
+        return _ok(cached[1])
+
+    # Aggregate straight from the stored preferences (stateless across workers)
+    agg = await _agent.aggregate_from_db(tid)
 
     if not agg.members:
         raise HTTPException(
@@ -176,20 +214,18 @@ async def get_trip_aggregate(trip_id: str | None = Query(None, description="Trip
     # Format conflicts
     conflicts = [{"field": key, "reason": reason} for key, reason in agg.conflicts]
 
-    return APIResponse(
-        code=0,
-        msg="ok",
-        data={
-            "trip_id": agg.trip_id,
-            "members": agg.members,
-            "member_count": len(agg.members),
-            "coverage": agg.coverage,
-            "ready_for_options": agg.ready_for_options,
-            "soft_preferences": agg.soft_mean,
-            "hard_constraints": agg.hard_union,
-            "conflicts": conflicts,
-        },
-    )
+    data = {
+        "trip_id": agg.trip_id,
+        "members": agg.members,
+        "member_count": len(agg.members),
+        "coverage": agg.coverage,
+        "ready_for_options": agg.ready_for_options,
+        "soft_preferences": agg.soft_mean,
+        "hard_constraints": agg.hard_union,
+        "conflicts": conflicts,
+    }
+    _agg_cache[tid] = (time.monotonic() + _AGG_CACHE_TTL_SECONDS, data)
+    return _ok(data)
 
 
 @router.get("/user", response_model=APIResponse)
@@ -204,7 +240,10 @@ async def get_user_preference(
 
     # Query MongoDB directly
     col = get_preferences_collection()
-    pref_doc = await col.find_one({"trip_id": tid, "user_id": user_id})
+    pref_doc = await col.find_one(
+        {"trip_id": tid, "user_id": user_id},
+        {"_id": 0, "budget_level": 1, "vibes": 1, "deal_breaker": 1, "notes": 1, "updated_at": 1},
+    )
 
     if not pref_doc:
         raise HTTPException(
@@ -226,7 +265,7 @@ async def get_user_preference(
     if budget_level is not None:
         hard["budget_level"] = str(budget_level)
     if deal_breaker:
-        deal_breakers = _agent._normalize_deal_breakers(deal_breaker)
+        deal_breakers = normalize_deal_breakers(deal_breaker)
         if deal_breakers:
             hard["deal_breakers"] = ", ".join(deal_breakers)
 
@@ -239,18 +278,16 @@ async def get_user_preference(
     summary = " | ".join(summary_parts) if summary_parts else "No summary"
 
     # Get updated timestamp
-    updated_at = pref_doc.get("updated_at", datetime.utcnow()).timestamp()
+    updated_at = (pref_doc.get("updated_at") or datetime.now(UTC)).timestamp()
 
-    return APIResponse(
-        code=0,
-        msg="ok",
-        data={
+    return _ok(
+        {
             "user_id": user_id,
             "trip_id": tid,
             "hard_constraints": hard,
             "soft_preferences": scorecard,
             "summary": summary,
-            "vector_id": _agent._vec_key(tid, user_id),
+            "vector_id": vec_key(tid, user_id),
             "updated_at": updated_at,
-        },
+        }
     )
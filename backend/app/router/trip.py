@@ -7,13 +7,20 @@ from datetime import datetime
 from collections import Counter
 from bson import ObjectId
 from fastapi import APIRouter, HTTPException, Query
+from pymongo import DeleteMany, InsertOne
 from pydantic import BaseModel, Field
 import asyncio
-
-from app.db.database import get_database, get_preferences_collection, get_activities_collection
+import traceback
+
+from app.db.database import (
+    get_activities_collection,
+    get_database,
+    get_preferences_collection,
+    trip_lookup_filter,
+)
 from app.models.common import APIResponse
 from app.models.trip import Trip
-from app.models.activity import Activity
+from app.models.activity import activity_docs
 from app.agents.preference_agent import PreferenceAgent, SurveyInput
 from app.agents.destination_research_agent import DestinationResearchAgent
 from app.agents.agent_state import AgentState
@@ -109,10 +116,7 @@ async def run_orchestrator_background(
 
     # Fetch trip to check for phase_tracking (consensus phases)
     trips_collection = db.trips
-    try:
-        trip_doc = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-    except:
-        trip_doc = await trips_collection.find_one({"trip_code": trip_id.upper()})
+    trip_doc = await trips_collection.find_one(trip_lookup_filter(trip_id), {"phase_tracking": 1})
     
     phase_tracking = trip_doc.get("phase_tracking") if trip_doc else None
     
@@ -135,8 +139,7 @@ async def run_orchestrator_background(
     try:
         # Get preference count for progress tracking
         prefs_collection = get_preferences_collection()
-        all_prefs = await prefs_collection.find({"trip_id": trip_id}).to_list(length=None)
-        pref_count = len(all_prefs)
+        pref_count = await prefs_collection.count_documents({"trip_id": trip_id})
         
         await broadcast_agent_status("Preference Agent", "running", f"Analyzing {pref_count} user preferences", progress={"current": 1, "total": 3})
         await asyncio.sleep(0.5)
@@ -172,32 +175,33 @@ async def run_orchestrator_background(
             activities = agent_data_out.get("activity_catalog", []) or []
             if activities:
                 col = get_activities_collection()
-                await col.delete_many({"trip_id": trip_id})
-                docs = []
+                records = []
                 for a in activities:
                     try:
-                        doc = Activity(
-                            trip_id=str(a.get("trip_id") or trip_id),
-                            name=str(a.get("name", "")),
-                            category=str(a.get("category", "Other")),
-                            rough_cost=a.get("rough_cost"),
-                            duration_min=a.get("duration_min"),
-                            lat=a.get("lat"),
-                            lng=a.get("lng"),
-                            tags=list(a.get("tags") or []),
-                            fits=list(a.get("fits") or []),
-                            score=float(a.get("score") or 0.0),
-                            rationale=str(a.get("rationale") or ""),
-                        )
-                        docs.append(doc.model_dump())
+                        records.append({
+                            "trip_id": str(a.get("trip_id") or trip_id),
+                            "name": str(a.get("name", "")),
+                            "category": str(a.get("category", "Other")),
+                            "rough_cost": a.get("rough_cost"),
+                            "duration_min": a.get("duration_min"),
+                            "lat": a.get("lat"),
+                            "lng": a.get("lng"),
+                            "tags": list(a.get("tags") or []),
+                            "fits": list(a.get("fits") or []),
+                            "score": float(a.get("score") or 0.0),
+                            "rationale": str(a.get("rationale") or ""),
+                        })
                     except Exception as e:
                         print(f"[orchestrator_background] Skipping invalid activity record: {e}")
+                docs = activity_docs(records)
+                # Replace this trip's activities in one round-trip (ordered: delete runs first)
+                res = await col.bulk_write(
+                    [DeleteMany({"trip_id": trip_id})] + [InsertOne(d) for d in docs], ordered=True
+                )
                 if docs:
-                    res = await col.insert_many(docs)
-                    activity_count = len(res.inserted_ids)
+                    activity_count = res.inserted_count
                     print(f"[orchestrator_background] ✅ Successfully saved {activity_count} activities for trip={trip_id}")
                     print(f"[orchestrator_background] Activity breakdown by category:")
-                    from collections import Counter
                     category_counts = Counter([doc.get('category', 'Other') for doc in docs])
                     for cat, count in category_counts.most_common():
                         print(f"  - {cat}: {count}")
@@ -206,10 +210,7 @@ async def run_orchestrator_background(
 
         # Inspect current phase to determine pause vs completion
         trips_collection = db.trips
-        try:
-            trip_after = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-        except:
-            trip_after = await trips_collection.find_one({"trip_code": trip_id.upper()})
+        trip_after = await trips_collection.find_one(trip_lookup_filter(trip_id), {"phase_tracking": 1, "members": 1})
         
         phase_tracking_out = (trip_after or {}).get("phase_tracking", {}) if trip_after else {}
         phases_out = phase_tracking_out.get("phases", {}) if phase_tracking_out else {}
@@ -287,7 +288,6 @@ async def run_orchestrator_background(
 
     except Exception as e:
         # Detailed error logging for devs
-        import traceback
         error_details = traceback.format_exc()
         print(f"[orchestrator_background] ❌ ERROR for trip {trip_id}")
         print(f"[orchestrator_background] Error type: {type(e).__name__}")
@@ -364,10 +364,7 @@ async def get_trip(
 
         # Try to find by ObjectId first, then by trip_code
         trip_doc = None
-        try:
-            trip_doc = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-        except:
-            trip_doc = await trips_collection.find_one({"trip_code": trip_id.upper()})
+        trip_doc = await trips_collection.find_one(trip_lookup_filter(trip_id))
 
         if not trip_doc:
             raise HTTPException(status_code=404, detail=f"Trip {trip_id} not found")
@@ -375,11 +372,16 @@ async def get_trip(
         # Convert ObjectId to string
         trip_doc["trip_id"] = str(trip_doc.pop("_id"))
 
-        # Get user details for members
+        # Get user details for all members in a single round-trip
         users_collection = db.users
+        members = trip_doc.get("members", [])
+        users = await users_collection.find({"google_id": {"$in": members}}).to_list(
+            length=None
+        )
+        users_by_id = {u.get("google_id"): u for u in users}
         member_details = []
-        for user_id in trip_doc.get("members", []):
-            user = await users_collection.find_one({"google_id": user_id})
+        for user_id in members:
+            user = users_by_id.get(user_id)
             if user:
                 member_details.append(
                     {
@@ -608,17 +610,13 @@ async def trigger_all_in(body: AllInTripRequest):
     Returns immediately so users can navigate to chat.
     """
     print(f"[all_in] Triggering for trip_id={body.trip_id}")
-    import asyncio
 
     try:
         db = get_database()
         trips_collection = db.trips
 
         # Get trip document
-        try:
-            trip_doc = await trips_collection.find_one({"_id": ObjectId(body.trip_id)})
-        except:
-            trip_doc = await trips_collection.find_one({"trip_code": body.trip_id.upper()})
+        trip_doc = await trips_collection.find_one(trip_lookup_filter(body.trip_id))
 
         if not trip_doc:
             raise HTTPException(status_code=404, detail=f"Trip {body.trip_id} not found")
@@ -665,15 +663,23 @@ async def trigger_all_in(body: AllInTripRequest):
 
         # Aggregate preferences
         prefs_collection = get_preferences_collection()
-        all_prefs = await prefs_collection.find({"trip_id": trip_id_str}).to_list(length=None)
-        print(f"[all_in] Found {len(all_prefs)} preferences for trip {trip_id_str}")
-
-        # Find overlapping dates and calculate duration
-        # For now, we'll find the most common date range or use the first available
+        # Stream only the two fields used below instead of buffering whole documents
+        prefs_cursor = prefs_collection.find(
+            {"trip_id": trip_id_str}, {"_id": 0, "available_dates": 1, "destination": 1}
+        ).batch_size(100)
+        pref_count = 0
         all_date_ranges = []
-        for p in all_prefs:
+        all_destinations = []
+        async for p in prefs_cursor:
+            pref_count += 1
             if p.get("available_dates"):
                 all_date_ranges.extend(p.get("available_dates", []))
+            if p.get("destination"):
+                all_destinations.append(p.get("destination").strip().lower())  # Normalize to lowercase
+        print(f"[all_in] Found {pref_count} preferences for trip {trip_id_str}")
+
+        # Find overlapping dates and calculate duration
+        # For now, we'll find the most common date range or use the first available
 
         # Pick the most common date range (or first one if no consensus)
         selected_dates = None
@@ -689,10 +695,8 @@ async def trigger_all_in(body: AllInTripRequest):
             if ":" in most_common_range:
                 start_str, end_str = most_common_range.split(":")
                 try:
-                    from datetime import datetime as dt
-
-                    start_date = dt.fromisoformat(start_str)
-                    end_date = dt.fromisoformat(end_str)
+                    start_date = datetime.fromisoformat(start_str)
+                    end_date = datetime.fromisoformat(end_str)
                     trip_duration_days = (end_date - start_date).days + 1
                     selected_dates = most_common_range
                 except Exception as e:
@@ -702,11 +706,6 @@ async def trigger_all_in(body: AllInTripRequest):
             trip_duration_days = 7  # Default if no dates provided
 
         # Aggregate destination from preferences (take the most common one)
-        all_destinations = []
-        for p in all_prefs:
-            if p.get("destination"):
-                all_destinations.append(p.get("destination").strip().lower())  # Normalize to lowercase
-        
         print(f"[all_in] All destinations from preferences: {all_destinations}")
         
         destination = None
@@ -742,16 +741,14 @@ async def trigger_all_in(body: AllInTripRequest):
         no_compatible_dates = False
         
         if all_date_ranges and len(all_date_ranges) > 1:
-            from datetime import datetime as dt
-            
             try:
                 # Parse all date ranges
                 parsed_ranges = []
                 for date_range in all_date_ranges:
                     if ":" in date_range:
                         start_str, end_str = date_range.split(":")
-                        start = dt.fromisoformat(start_str)
-                        end = dt.fromisoformat(end_str)
+                        start = datetime.fromisoformat(start_str)
+                        end = datetime.fromisoformat(end_str)
                         parsed_ranges.append((start, end, date_range))
                 
                 print(f"[all_in] Checking {len(parsed_ranges)} date ranges for overlaps")
@@ -785,8 +782,8 @@ async def trigger_all_in(body: AllInTripRequest):
                     # Parse to get duration
                     if ":" in selected_dates:
                         start_str, end_str = selected_dates.split(":")
-                        start_date = dt.fromisoformat(start_str)
-                        end_date = dt.fromisoformat(end_str)
+                        start_date = datetime.fromisoformat(start_str)
+                        end_date = datetime.fromisoformat(end_str)
                         trip_duration_days = (end_date - start_date).days + 1
                 else:
                     # Multiple overlapping periods - need voting
@@ -1150,8 +1147,6 @@ async def trigger_all_in(body: AllInTripRequest):
         raise
     except Exception as e:
         # Log full exception to server console for debugging
-        import traceback
-
         print(f"[all_in] Error: {e}")
         traceback.print_exc()
         # Return a controlled APIResponse with error details (safe for dev)
@@ -1207,10 +1202,7 @@ async def mark_user_ready(
         trips_collection = db.trips
         
         # Find trip
-        try:
-            trip_doc = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-        except:
-            trip_doc = await trips_collection.find_one({"trip_code": trip_id.upper()})
+        trip_doc = await trips_collection.find_one(trip_lookup_filter(trip_id))
         
         if not trip_doc:
             raise HTTPException(status_code=404, detail=f"Trip {trip_id} not found")
@@ -1276,7 +1268,6 @@ async def mark_user_ready(
             }
             
             # Run in background
-            import asyncio
             asyncio.create_task(consensus.run(initial_state))
         
         return APIResponse(
@@ -1311,10 +1302,7 @@ async def unmark_user_ready(
         trips_collection = db.trips
         
         # Find trip
-        try:
-            trip_doc = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-        except:
-            trip_doc = await trips_collection.find_one({"trip_code": trip_id.upper()})
+        trip_doc = await trips_collection.find_one(trip_lookup_filter(trip_id))
         
         if not trip_doc:
             raise HTTPException(status_code=404, detail=f"Trip {trip_id} not found")
@@ -1390,10 +1378,7 @@ async def generate_itinerary_now(trip_id: str):
     try:
         db = get_database()
         trips_collection = db.trips
-        try:
-            trip_doc = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-        except Exception:
-            trip_doc = await trips_collection.find_one({"trip_code": trip_id.upper()})
+        trip_doc = await trips_collection.find_one(trip_lookup_filter(trip_id))
         if not trip_doc:
             raise HTTPException(status_code=404, detail=f"Trip {trip_id} not found")
 
@@ -1428,7 +1413,6 @@ async def generate_itinerary_now(trip_id: str):
             })
 
         # Kick orchestrator with prefilled catalog to generate itinerary
-        import asyncio
         asyncio.create_task(
             run_orchestrator_background(
                 trip_id_str, destination, int(trip_duration_days), selected_dates, activity_catalog
@@ -1462,10 +1446,7 @@ async def submit_vote(trip_id: str, vote: VoteRequest):
         trips_collection = db.trips
         
         # Find trip
-        try:
-            trip_doc = await trips_collection.find_one({"_id": ObjectId(trip_id)})
-        except:
-            trip_doc = await trips_collection.find_one({"trip_code": trip_id.upper()})
+        trip_doc = await trips_collection.find_one(trip_lookup_filter(trip_id))
         
         if not trip_doc:
             raise HTTPException(status_code=404, detail="Trip not found")
@@ -1615,12 +1596,20 @@ async def get_trip_itinerary(trip_id: str):
         from app.db.database import get_itineraries_collection
         
         itineraries_collection = get_itineraries_collection()
-        
-        # Find the current itinerary for this trip
-        itinerary = await itineraries_collection.find_one(
-            {"trip_id": trip_id, "is_current": True},
-            sort=[("version", -1)]  # Get the latest version
+        activities_col = get_activities_collection()
+
+        # Find the current itinerary for this trip, reading its activities concurrently
+        # (both only depend on trip_id). An activity read failure only skips enrichment.
+        itinerary, activities = await asyncio.gather(
+            itineraries_collection.find_one(
+                {"trip_id": trip_id, "is_current": True},
+                sort=[("version", -1)]  # Get the latest version
+            ),
+            activities_col.find({"trip_id": trip_id}).to_list(length=None),
+            return_exceptions=True,
         )
+        if isinstance(itinerary, Exception):
+            raise itinerary
         
         if not itinerary:
             return APIResponse(
@@ -1636,8 +1625,8 @@ async def get_trip_itinerary(trip_id: str):
         # Append activity data into each itinerary item for convenience on the client
         # We keep itinerary storage lean (only ids + schedule), but enrich on read.
         try:
-            activities_col = get_activities_collection()
-            activities = await activities_col.find({"trip_id": trip_id}).to_list(length=None)
+            if isinstance(activities, Exception):
+                raise activities
             id_to_activity = {str(a.get("_id")): a for a in activities if a.get("_id")}
             name_to_activity = {str(a.get("name", "")).strip().lower(): a for a in activities if a.get("name")}
 
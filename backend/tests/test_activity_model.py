@@ -0,0 +1,38 @@
+"""
+Tests for batch validation of activity records
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.activity import activity_docs
+
+
+def record(name: str, **overrides) -> dict:
+    return {"trip_id": "trip-1", "name": name, "category": "Food", **overrides}
+
+
+def test_valid_batch_is_returned_with_name_lower():
+    docs = activity_docs([record("Sushi Bar"), record("Night Market")])
+
+    assert [doc["name"] for doc in docs] == ["Sushi Bar", "Night Market"]
+    assert [doc["name_lower"] for doc in docs] == ["sushi bar", "night market"]
+
+
+def test_invalid_record_is_skipped_and_valid_ones_kept(caplog):
+    records = [
+        record("Sushi Bar"),
+        record("Broken", rough_cost="not a number"),
+        record("Night Market"),
+    ]
+
+    with caplog.at_level(logging.WARNING, logger="app.models.activity"):
+        docs = activity_docs(records)
+
+    assert [doc["name"] for doc in docs] == ["Sushi Bar", "Night Market"]
+    assert [doc["name_lower"] for doc in docs] == ["sushi bar", "night market"]
+    assert "Skipping invalid activity record" in caplog.text
@@ -0,0 +1,42 @@
+"""
+Tests for heyAI change command parsing in the chat router
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.router.chat import parse_change_command
+
+
+def test_parse_destination_command():
+    assert parse_change_command("change destination to Rome") == ("dest", "Rome")
+
+
+def test_destination_takes_precedence_over_add():
+    command = "suggest something fun, then change destination to Rome"
+    assert parse_change_command(command) == ("dest", "Rome")
+
+
+def test_remove_takes_precedence_over_add():
+    assert parse_change_command("remove the add-on boat tour") == ("act", "the add-on boat tour")
+
+
+def test_destination_takes_precedence_over_remove():
+    # The destination keyword claims the command even when its argument is missing
+    assert parse_change_command("remove the destination") is None
+
+
+def test_parse_add_command():
+    command = "suggest a food tour"
+    assert parse_change_command(command) == ("add", command)
+
+
+def test_destination_without_target_is_not_understood():
+    assert parse_change_command("destination Rome please") is None
+
+
+def test_unknown_command_is_not_understood():
+    assert parse_change_command("what is the weather like") is None
@@ -0,0 +1,104 @@
+"""
+Tests for the in-memory LLM response caches
+"""
+
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import llm_cache
+from app.core.llm_cache import ExactResponseCache, SemanticResponseCache, prompt_hash
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def unit_vector(similarity: float) -> list[float]:
+    """2-d unit vector whose cosine similarity with [1, 0] is `similarity`."""
+    return [similarity, math.sqrt(1 - similarity**2)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_cache.time, "time", fake)
+    return fake
+
+
+def test_exact_cache_expires_after_ttl(clock):
+    cache = ExactResponseCache(ttl_seconds=60)
+    cache.set("k", "answer")
+
+    clock.now += 59
+    assert cache.get("k") == "answer"
+
+    clock.now += 1
+    assert cache.get("k") is None
+
+
+def test_exact_cache_evicts_least_recently_used(clock):
+    cache = ExactResponseCache(maxsize=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_exact_cache_keys_are_isolated(clock):
+    cache = ExactResponseCache()
+    turns = [("user", "things to do in Paris")]
+    cache.set(prompt_hash("gpt-4o-mini", turns), "Paris answer")
+
+    assert cache.get(prompt_hash("gpt-4o-mini", [("user", "things to do in Rome")])) is None
+    assert cache.get(prompt_hash("gpt-4o", turns)) is None
+    assert cache.get(prompt_hash("gpt-4o-mini", [("assistant", "things to do in Paris")])) is None
+    assert cache.get(prompt_hash("gpt-4o-mini", turns)) == "Paris answer"
+
+
+def test_semantic_cache_threshold(clock):
+    cache = SemanticResponseCache()
+    cache.update([1.0, 0.0], "scope", "cached answer")
+
+    assert cache.lookup(unit_vector(0.95), "scope") == "cached answer"
+    assert cache.lookup(unit_vector(0.9), "scope") == "cached answer"
+    assert cache.lookup(unit_vector(0.85), "scope") is None
+
+
+def test_semantic_cache_isolates_conversation_scopes(clock):
+    cache = SemanticResponseCache()
+    paris = prompt_hash("gpt-4o-mini", [("user", "Plan a trip to Paris")])
+    rome = prompt_hash("gpt-4o-mini", [("user", "Plan a trip to Rome")])
+    other_model = prompt_hash("gpt-4o", [("user", "Plan a trip to Paris")])
+    cache.update([1.0, 0.0], paris, "Paris answer")
+
+    # An identical question after a different history (or model) is not served
+    assert cache.lookup([1.0, 0.0], rome) is None
+    assert cache.lookup([1.0, 0.0], other_model) is None
+    assert cache.lookup([1.0, 0.0], paris) == "Paris answer"
+
+
+def test_semantic_cache_entries_expire_after_four_hours(clock):
+    cache = SemanticResponseCache()
+    cache.update([1.0, 0.0], "scope", "cached answer")
+
+    clock.now += 4 * 60 * 60 - 1
+    assert cache.lookup([1.0, 0.0], "scope") == "cached answer"
+
+    clock.now += 1
+    assert cache.lookup([1.0, 0.0], "scope") is None
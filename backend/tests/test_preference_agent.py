@@ -3,13 +3,19 @@ Test suite for Preference Agent with new Preference model
 Tests the full workflow: add preferences → submit → aggregate
 """
 
+import asyncio
 import sys
 from pathlib import Path
 
 # Add parent directory to path to import app modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.agents.preference_agent import PreferenceAgent, SurveyInput
+from app.agents import preference_agent
+from app.agents.preference_agent import (
+    PreferenceAgent,
+    SurveyInput,
+    preference_group_pipeline,
+)
 
 
 def print_section(title: str):
@@ -288,6 +294,157 @@ def test_preference_agent():
     return agent, agg_updated, result_state
 
 
+def test_preference_agent_skips_unchanged_survey():
+    """Re-ingesting an identical survey reuses the stored profile instead of re-embedding"""
+
+    print_section("RE-INGESTING UNCHANGED SURVEY")
+    agent = PreferenceAgent()
+    trip_id = "g2"
+    survey = SurveyInput(
+        text="Adventure Nature hiking trips",
+        hard={"budget_level": "3"},
+        soft={"adventure": 0.9, "nature": 0.8},
+    )
+
+    first = agent.ingest_survey(trip_id, "user_dana", survey)
+    again = agent.ingest_survey(trip_id, "user_dana", survey)
+    print(f"  Content hash: {first.content_hash}")
+    assert again is first
+
+    # Any change to the survey rebuilds the profile
+    changed = agent.ingest_survey(
+        trip_id,
+        "user_dana",
+        SurveyInput(text=survey.text, hard={"budget_level": "4"}, soft=survey.soft),
+    )
+    assert changed is not first
+    assert changed.content_hash != first.content_hash
+    assert agent.profiles[(trip_id, "user_dana")] is changed
+    assert agent.trips[trip_id] == ["user_dana"]
+
+
+class FakeCursor:
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    """Evaluates the $match / $group($push) stages used by aggregate_from_db."""
+
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+
+    def aggregate(self, pipeline: list[dict]) -> FakeCursor:
+        docs = self.docs
+        for stage in pipeline:
+            if "$match" in stage:
+                docs = [d for d in docs if all(d.get(k) == v for k, v in stage["$match"].items())]
+            elif "$group" in stage:
+                spec = stage["$group"]
+                groups: dict = {}
+                for d in docs:
+                    key = d.get(spec["_id"].lstrip("$"))
+                    row = groups.setdefault(key, {"_id": key})
+                    for out, acc in spec.items():
+                        if out != "_id":
+                            row.setdefault(out, []).append(d.get(acc["$push"].lstrip("$")))
+                docs = list(groups.values())
+        return FakeCursor(docs)
+
+    async def find_one(self, query, projection=None):
+        return self.docs[0] if self.docs else None
+
+
+class FakeDatabase:
+    def __init__(self, preferences: list[dict], trip: dict):
+        self.preferences = FakeCollection(preferences)
+        self.trips = FakeCollection([trip])
+
+
+def test_preference_group_pipeline_shape():
+    """The $group stage collects one document per trip with every field aggregate_from_db reads"""
+
+    pipeline = preference_group_pipeline("g3")
+    assert pipeline[0] == {"$match": {"trip_id": "g3"}}
+    group = pipeline[1]["$group"]
+    assert group["_id"] == "$trip_id"
+    assert {k: v["$push"] for k, v in group.items() if k != "_id"} == {
+        "members": "$user_id",
+        "budgets": "$budget_level",
+        "deal_breakers": "$deal_breaker",
+        "vibes": "$vibes",
+    }
+
+
+def test_aggregate_from_db_matches_in_memory_aggregate(monkeypatch):
+    """The server-side $group path yields the same aggregate as the in-memory profiles"""
+
+    print_section("AGGREGATE FROM DB PARITY")
+    trip_id = "g3"
+    preferences = [
+        {
+            "trip_id": trip_id,
+            "user_id": "user_erin",
+            "budget_level": 3,
+            "deal_breaker": "No early mornings",
+            "vibes": ["Adventure", "Food"],
+        },
+        {
+            "trip_id": trip_id,
+            "user_id": "user_finn",
+            "budget_level": 2,
+            "deal_breaker": "",
+            "vibes": ["Food", "Culture", "Relax"],
+        },
+        {
+            "trip_id": trip_id,
+            "user_id": "user_gale",
+            "budget_level": 3,
+            "deal_breaker": "Must have vegetarian options",
+            "vibes": ["Culture"],
+        },
+        {
+            "trip_id": "other",
+            "user_id": "user_hana",
+            "budget_level": 1,
+            "deal_breaker": "No flights",
+            "vibes": ["Nightlife"],
+        },
+    ]
+
+    agent = PreferenceAgent()
+    for doc in preferences:
+        if doc["trip_id"] != trip_id:
+            continue
+        hard = {"budget_level": str(doc["budget_level"])}
+        if doc["deal_breaker"]:
+            hard["deal_breaker"] = doc["deal_breaker"]
+        agent.ingest_survey(
+            trip_id,
+            doc["user_id"],
+            SurveyInput(
+                text=" ".join(doc["vibes"]), hard=hard, soft=agent._normalize_soft(doc["vibes"])
+            ),
+        )
+    expected = agent.aggregate(trip_id)
+
+    fake_db = FakeDatabase(preferences, {"members": ["user_erin", "user_finn", "user_gale"]})
+    monkeypatch.setattr(preference_agent, "get_database", lambda: fake_db)
+    actual = asyncio.run(agent.aggregate_from_db(trip_id))
+
+    print(f"  Hard: {actual.hard_union}")
+    print(f"  Soft: {actual.soft_mean}")
+    assert actual.members == expected.members
+    assert actual.hard_union == expected.hard_union
+    assert actual.soft_mean == expected.soft_mean
+    assert actual.conflicts == expected.conflicts
+    assert actual.coverage == expected.coverage
+    assert actual.ready_for_options == expected.ready_for_options
+
+
 if __name__ == "__main__":
     print("\n" + "🎯" * 40)
     print(" " * 20 + "PREFERENCE AGENT TEST")
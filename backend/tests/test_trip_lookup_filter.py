@@ -0,0 +1,32 @@
+"""
+Tests for trip_lookup_filter, which resolves a trip id or trip code to a trips query
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+
+from app.db.database import trip_lookup_filter
+
+
+def test_valid_object_id_matches_by_id():
+    oid = ObjectId()
+    query = trip_lookup_filter(str(oid))
+    assert {"_id": oid} in query["$or"]
+
+
+def test_lowercase_code_is_uppercased():
+    assert trip_lookup_filter("xy7k9m") == {"trip_code": "XY7K9M"}
+
+
+def test_object_id_shaped_code_still_matches_by_code():
+    # 24 hex characters pass ObjectId.is_valid but may really be a trip code
+    code = "abcdef0123456789abcdef01"
+    assert ObjectId.is_valid(code)
+    assert trip_lookup_filter(code) == {
+        "$or": [{"_id": ObjectId(code)}, {"trip_code": code.upper()}]
+    }